@@ -0,0 +1,233 @@
+# auth_service.py
+# -------------------------------------------------------------
+# Password hashing off the Streamlit thread, login throttling
+# and signed session tokens.
+# -------------------------------------------------------------
+
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+
+import backend
+
+# ---------------------------
+# Configuration
+# ---------------------------
+BCRYPT_ROUNDS = int(os.environ.get("CLAUSEEASE_BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("CLAUSEEASE_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_PENDING_HASHES = int(os.environ.get("CLAUSEEASE_MAX_PENDING_HASHES", "32"))
+HASH_TIMEOUT_S = 10.0
+
+
+def _limit(name: str, default: str) -> tuple[int, int]:
+    """(max attempts, window in seconds) from an "attempts/seconds" setting."""
+    attempts, window = os.environ.get(name, default).split("/")
+    return int(attempts), int(window)
+
+
+# Every attempt counts against the account; only failed ones against the
+# client address, so users behind one proxy or NAT don't lock each other out.
+EMAIL_LIMIT = _limit("CLAUSEEASE_EMAIL_LIMIT", "5/300")
+IP_LIMIT = _limit("CLAUSEEASE_IP_LIMIT", "30/300")
+
+TOKEN_TTL_S = 12 * 3600
+# Tokens only need to outlive the server process unless a shared secret is configured.
+_SECRET = os.environ.get("CLAUSEEASE_SECRET", "").encode() or secrets.token_bytes(32)
+
+
+class AuthBusy(Exception):
+    """Too many hashes are queued; the caller should ask the user to retry."""
+
+
+class AuthThrottled(Exception):
+    """Too many attempts for this email or client address."""
+
+
+# ---------------------------
+# Worker pool
+# ---------------------------
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(MAX_PENDING_HASHES)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _run(fn, *args):
+    """
+    Run fn in the hash pool, refusing work when the queue is full.
+    A queue slot is held until the job finishes, even if the caller gave up
+    waiting for it, so abandoned hashes still count against the limit.
+    """
+    if not _pending.acquire(blocking=False):
+        raise AuthBusy("The server is busy. Please try again in a moment.")
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda f: _pending.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT_S)
+    except TimeoutError:
+        future.cancel()  # only succeeds while still queued
+        raise AuthBusy("The server is busy. Please try again in a moment.") from None
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> bytes:
+    return _run(_hashpw, password.encode(), rounds)
+
+
+def check_password(password: str, hashed: bytes) -> bool:
+    return _run(_checkpw, password.encode(), hashed)
+
+
+def hash_rounds(hashed: bytes) -> int:
+    """Work factor stored in a bcrypt hash, e.g. 12 for b'$2b$12$...'."""
+    return int(hashed.split(b"$")[2])
+
+
+def needs_rehash(hashed: bytes) -> bool:
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+# ---------------------------
+# Throttling
+# ---------------------------
+_attempts: dict[str, deque] = defaultdict(deque)
+_attempts_lock = threading.Lock()
+
+
+def _allow(key: str, limit: tuple[int, int], charge: bool = True) -> bool:
+    """Whether key is under its limit; with charge=True this attempt is counted too."""
+    max_attempts, window = limit
+    now = time.monotonic()
+    with _attempts_lock:
+        hits = _attempts[key]
+        while hits and now - hits[0] > window:
+            hits.popleft()
+        if len(hits) >= max_attempts:
+            return False
+        if charge:
+            hits.append(now)
+        return True
+
+
+def _email_key(email: str) -> str:
+    return f"email:{email.strip().lower()}"
+
+
+def _check_throttle(email: str, ip: str | None):
+    if not _allow(_email_key(email), EMAIL_LIMIT):
+        raise AuthThrottled("Too many attempts for this account. Please wait a few minutes.")
+    if ip and not _allow(f"ip:{ip}", IP_LIMIT, charge=False):
+        raise AuthThrottled("Too many attempts from your network. Please wait a few minutes.")
+
+
+def _record_failure(ip: str | None):
+    if ip:
+        _allow(f"ip:{ip}", IP_LIMIT)
+
+
+def _clear_throttle(email: str):
+    """A successful login forgives earlier failed attempts on the account."""
+    with _attempts_lock:
+        _attempts.pop(_email_key(email), None)
+
+
+# ---------------------------
+# Login
+# ---------------------------
+def authenticate(email: str, password: str, ip: str | None = None):
+    """
+    Verify credentials and return a session dict, or None if they are wrong.
+    Raises AuthThrottled / AuthBusy before any hashing work is queued.
+    Hashes made with an old work factor are transparently upgraded.
+    """
+    _check_throttle(email, ip)
+    data = backend.get_user(email)
+    if not data or not check_password(password, data[4]):
+        _record_failure(ip)
+        return None
+    _clear_throttle(email)
+    if needs_rehash(data[4]):
+        backend.store_password_hash(email, hash_password(password))
+    return {"id": data[0], "first_name": data[1], "email": data[3]}
+
+
+# ---------------------------
+# Session tokens
+# ---------------------------
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def issue_token(user: dict) -> str:
+    payload = json.dumps({"uid": user["id"], "email": user["email"], "exp": int(time.time()) + TOKEN_TTL_S})
+    body = _b64(payload.encode())
+    sig = _b64(hmac.new(_SECRET, body.encode(), hashlib.sha256).digest())
+    return f"{body}.{sig}"
+
+
+def verify_token(token: str | None) -> dict | None:
+    """Returns the token payload if the signature is valid and it has not expired."""
+    if not token or "." not in token:
+        return None
+    body, sig = token.rsplit(".", 1)
+    expected = _b64(hmac.new(_SECRET, body.encode(), hashlib.sha256).digest())
+    if not hmac.compare_digest(sig, expected):
+        return None
+    payload = json.loads(_unb64(body))
+    if payload["exp"] < time.time():
+        return None
+    return payload
+
+
+# ---------------------------
+# Streamlit pages
+# ---------------------------
+def require_login() -> dict:
+    """
+    Stop the page unless the session holds a user with a valid token for it.
+    The token is checked with an HMAC, so reruns never hash again.
+    Returns st.session_state.user.
+    """
+    import streamlit as st
+
+    user = st.session_state.get("user")
+    session = verify_token(st.session_state.get("auth_token"))
+    if user is None or session is None or session["uid"] != user["id"]:
+        st.warning("Please login to access this page.")
+        st.stop()
+    return user
@@ -1,5 +1,6 @@
 import sqlite3
-import bcrypt
+
+import auth_service
 
 # --- Initialize DB ---
 def init_db():
@@ -29,8 +30,8 @@ def add_user(email, password, first_name, last_name):
         conn.close()
         return False  # email already exists
 
-    # hash password
-    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    # hash password (in the auth worker pool, not on the calling thread)
+    hashed = auth_service.hash_password(password)
 
     # insert new user
     cur.execute("INSERT INTO users (email, password, first_name, last_name) VALUES (?, ?, ?, ?)",
@@ -50,9 +51,13 @@ def get_user(email):
 
 # --- Update password ---
 def update_password(email, new_password):
+    store_password_hash(email, auth_service.hash_password(new_password))
+
+# --- Store an already computed hash (used for rehash-on-login) ---
+def store_password_hash(email, hashed):
     conn = sqlite3.connect("users.db")
     cur = conn.cursor()
-    hashed = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt())
     cur.execute("UPDATE users SET password=? WHERE email=?", (hashed, email))
     conn.commit()
     conn.close()
+
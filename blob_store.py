@@ -0,0 +1,228 @@
+# blob_store.py
+# -------------------------------------------------------------
+# Disk-backed, content-addressed store for large session values.
+# Pages keep a small BlobRef in st.session_state instead of the
+# text itself; hot blobs are cached in memory under a global cap.
+#
+#   python blob_store.py gc               # delete unreferenced blobs older than 7 days
+#   python blob_store.py gc --days 1
+# -------------------------------------------------------------
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+BLOB_DIR = os.environ.get("CLAUSEEASE_BLOB_DIR", "blobs")
+# Values smaller than this stay inline in session state.
+SPILL_BYTES = 64 * 1024
+# Global cap on blob bytes held in memory, across all sessions.
+MEMORY_CAP_BYTES = int(os.environ.get("CLAUSEEASE_BLOB_CACHE_MB", "256")) * 1024 * 1024
+# Sessions not seen for this long are dropped from the usage report.
+SESSION_IDLE_S = 3600
+# Unreferenced blobs older than this are deleted; gc runs in the background
+# at most once per GC_INTERVAL_S from session_put.
+GC_MAX_AGE_S = float(os.environ.get("CLAUSEEASE_BLOB_MAX_AGE_DAYS", "7")) * 86400
+GC_INTERVAL_S = 3600
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    digest: str
+    size: int
+
+
+# ---------------------------
+# Storage
+# ---------------------------
+_cache: OrderedDict = OrderedDict()   # digest -> (str, size), least recently used first
+_cache_bytes = 0
+_sessions: dict[str, dict] = {}       # session id -> {"refs": {digest: size}, "seen": ts}
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "evictions": 0, "spilled": 0}
+
+
+def _path(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def _remember(digest: str, text: str, size: int):
+    """Insert into the LRU cache and evict down to the memory cap. Caller holds _lock."""
+    global _cache_bytes
+    if digest in _cache:
+        _cache.move_to_end(digest)
+        return
+    _cache[digest] = (text, size)
+    _cache_bytes += size
+    while _cache_bytes > MEMORY_CAP_BYTES and len(_cache) > 1:
+        _, (_, old_size) = _cache.popitem(last=False)
+        _cache_bytes -= old_size
+        stats["evictions"] += 1
+
+
+def put(text: str, session_id: str | None = None) -> BlobRef:
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = _path(digest)
+    if os.path.exists(path):
+        # Refresh the age gc() looks at, so content still in use is kept.
+        os.utime(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    ref = BlobRef(digest, len(data))
+    with _lock:
+        _remember(digest, text, ref.size)
+        stats["spilled"] += 1
+        if session_id:
+            _track(session_id, ref)
+    return ref
+
+
+def get(ref: BlobRef) -> str:
+    with _lock:
+        entry = _cache.get(ref.digest)
+        if entry is not None:
+            _cache.move_to_end(ref.digest)
+            stats["hits"] += 1
+            return entry[0]
+        stats["misses"] += 1
+    with open(_path(ref.digest), "rb") as f:
+        text = f.read().decode("utf-8")
+    with _lock:
+        _remember(ref.digest, text, ref.size)
+    return text
+
+
+def spill(value, session_id: str | None = None):
+    """Return a BlobRef for large strings, the value itself otherwise."""
+    if isinstance(value, str) and len(value) >= SPILL_BYTES // 4 and len(value.encode("utf-8")) >= SPILL_BYTES:
+        return put(value, session_id)
+    return value
+
+
+def resolve(value):
+    """Inverse of spill: load BlobRefs, pass anything else through."""
+    return get(value) if isinstance(value, BlobRef) else value
+
+
+def gc(max_age_s: float = GC_MAX_AGE_S) -> int:
+    """Delete blobs on disk that no live session references and are older than max_age_s."""
+    with _lock:
+        live = {d for s in _sessions.values() for d in s["refs"]}
+    removed, cutoff = 0, time.time() - max_age_s
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if name not in live and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    stats["gc_removed"] = stats.get("gc_removed", 0) + removed
+    return removed
+
+
+_last_gc = 0.0
+
+
+def maybe_gc():
+    """Start a background gc() if the last one was more than GC_INTERVAL_S ago."""
+    global _last_gc
+    with _lock:
+        if time.time() - _last_gc < GC_INTERVAL_S:
+            return
+        _last_gc = time.time()
+    threading.Thread(target=gc, name="blob-gc", daemon=True).start()
+
+
+# ---------------------------
+# Per-session accounting
+# ---------------------------
+def _track(session_id: str, ref: BlobRef):
+    entry = _sessions.setdefault(session_id, {"refs": {}, "seen": 0.0})
+    entry["refs"][ref.digest] = ref.size
+    entry["seen"] = time.time()
+
+
+def current_session_id() -> str | None:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def memory_report() -> dict:
+    """Global cache usage plus, per session, bytes referenced and bytes currently in memory."""
+    now = time.time()
+    with _lock:
+        for sid in [s for s, e in _sessions.items() if now - e["seen"] > SESSION_IDLE_S]:
+            del _sessions[sid]
+        sessions = {
+            sid: {
+                "blobs": len(e["refs"]),
+                "referenced_bytes": sum(e["refs"].values()),
+                "resident_bytes": sum(size for d, size in e["refs"].items() if d in _cache),
+            }
+            for sid, e in _sessions.items()
+        }
+        return {
+            "cache_bytes": _cache_bytes,
+            "cache_cap_bytes": MEMORY_CAP_BYTES,
+            "cached_blobs": len(_cache),
+            **stats,
+            "sessions": sessions,
+        }
+
+
+# ---------------------------
+# Streamlit helpers
+# ---------------------------
+def session_put(key: str, value):
+    """st.session_state[key] = value, spilling large strings (also inside dicts) to the store."""
+    import streamlit as st
+
+    sid = current_session_id()
+    maybe_gc()
+    if isinstance(value, dict):
+        value = {k: spill(v, sid) for k, v in value.items()}
+    else:
+        value = spill(value, sid)
+    st.session_state[key] = value
+
+
+def session_get(key: str, default=None):
+    """Read back a value stored with session_put, loading spilled strings."""
+    import streamlit as st
+
+    sid = current_session_id()
+    if sid:
+        with _lock:
+            if sid in _sessions:
+                _sessions[sid]["seen"] = time.time()
+    value = st.session_state.get(key, default)
+    if isinstance(value, dict):
+        return {k: resolve(v) for k, v in value.items()}
+    return resolve(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the session blob store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_gc = sub.add_parser("gc", help="Delete unreferenced blobs older than --days")
+    p_gc.add_argument("--days", type=float, default=GC_MAX_AGE_S / 86400)
+    args = parser.parse_args(argv)
+    print(f"Removed {gc(args.days * 86400)} blob(s) from {BLOB_DIR}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+# clause_search.py
+# -------------------------------------------------------------
+# Semantic clause search: documents are split into clauses,
+# embedded with a small local sentence-embedding model and
+# stored as float16 rows in a memory-mapped file with an
+# inverted-file (IVF) approximate nearest neighbour index.
+#
+#   python clause_search.py             # index new documents
+#   python clause_search.py --rebuild   # retrain the coarse quantizer
+# -------------------------------------------------------------
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+DB_PATH = "users.db"
+INDEX_DIR = os.environ.get("CLAUSEEASE_INDEX_DIR", "index")
+EMBED_MODEL = os.environ.get("CLAUSEEASE_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+DIM = 384
+
+# Below this many clauses an exact scan is fast enough and needs no training.
+BRUTE_FORCE_LIMIT = 20_000
+NPROBE = 16
+# Retrain the coarse quantizer once the index has grown this much since training.
+RETRAIN_GROWTH = 4
+
+MIN_CLAUSE_CHARS = 40
+MAX_CLAUSE_CHARS = 1500
+
+_CLAUSE_BREAK = re.compile(
+    r"\n\s*\n|\n(?=\s*(?:\d+(?:\.\d+)*[.)]|\([a-z0-9]+\)|section\s+\d+|article\s+[\divx]+)\s)",
+    re.I,
+)
+_SENTENCE_END = re.compile(r"(?<=[.;:])\s+")
+
+
+# ---------------------------
+# Clause splitting
+# ---------------------------
+def split_clauses(text: str) -> list[tuple[int, int]]:
+    """
+    (start, end) character spans of clauses: blank lines and numbered
+    headings ("1.2", "(a)", "Section 4") start a new clause, tiny pieces
+    are merged forward and very long ones are cut at sentence ends.
+    """
+    spans, start = [], 0
+    for m in _CLAUSE_BREAK.finditer(text):
+        spans.append((start, m.start()))
+        start = m.end()
+    spans.append((start, len(text)))
+
+    merged = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        if s >= e:
+            continue
+        if merged and merged[-1][1] - merged[-1][0] < MIN_CLAUSE_CHARS:
+            merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+
+    result = []
+    for s, e in merged:
+        while e - s > MAX_CLAUSE_CHARS:
+            cut = None
+            for m in _SENTENCE_END.finditer(text, s + MIN_CLAUSE_CHARS, s + MAX_CLAUSE_CHARS):
+                cut = m.start()
+            cut = cut or s + MAX_CLAUSE_CHARS
+            result.append((s, cut))
+            s = cut
+            while s < e and text[s].isspace():
+                s += 1
+        if s < e:
+            result.append((s, e))
+    return result
+
+
+# ---------------------------
+# Embedding
+# ---------------------------
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _load_encoder():
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            from transformers import AutoModel, AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(EMBED_MODEL)
+            model = AutoModel.from_pretrained(EMBED_MODEL)
+            model.eval()
+            _encoder = (tokenizer, model)
+        return _encoder
+
+
+def embed(texts: list[str], batch_size: int = 64) -> np.ndarray:
+    """L2-normalised mean-pooled embeddings, float32 of shape (len(texts), DIM)."""
+    import torch
+
+    tokenizer, model = _load_encoder()
+    out = np.zeros((len(texts), DIM), dtype=np.float32)
+    # Batch similar lengths together to keep padding small.
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.inference_mode():
+        for b in range(0, len(order), batch_size):
+            idx = order[b:b + batch_size]
+            enc = tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                            max_length=256, return_tensors="pt")
+            hidden = model(**enc).last_hidden_state
+            mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+            out[idx] = pooled.numpy()
+    return out
+
+
+# ---------------------------
+# Index
+# ---------------------------
+def _nearest(x: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    assign = np.empty(len(x), dtype=np.int32)
+    for s in range(0, len(x), chunk):
+        assign[s:s + chunk] = np.argmax(np.asarray(x[s:s + chunk], dtype=np.float32) @ centroids.T, axis=1)
+    return assign
+
+
+def _score_rows(vectors: np.ndarray, rows: np.ndarray, query: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Cosine scores of the given (sorted) rows against query."""
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate([
+        np.asarray(vectors[rows[s:s + chunk]], dtype=np.float32) @ query for s in range(0, len(rows), chunk)
+    ])
+
+
+def _train_centroids(sample: np.ndarray, nlist: int, iters: int = 10) -> np.ndarray:
+    """Spherical k-means on a sample of vectors."""
+    rng = np.random.default_rng(0)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(min=1e-9)
+    return centroids
+
+
+class ClauseIndex:
+    """
+    Append-only vector store under INDEX_DIR:
+        vectors.f16     float16 rows, one per clause (memory-mapped)
+        lists.i4        IVF list id per row (-1 before training)
+        centroids.npy   coarse quantizer
+        meta.json       trained row count
+    Clause metadata lives in the clause_index table; row id == file position.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, db_path: str = DB_PATH):
+        self.index_dir = index_dir
+        self.db_path = db_path
+        os.makedirs(index_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(index_dir, "vectors.f16")
+        self._lists_path = os.path.join(index_dir, "lists.i4")
+        self._centroids_path = os.path.join(index_dir, "centroids.npy")
+        self._meta_path = os.path.join(index_dir, "meta.json")
+        self._init_tables()
+        self._load()
+
+    # --- storage ---
+    def _conn(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_tables(self):
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS clause_index(
+                id INTEGER PRIMARY KEY,
+                document_id INTEGER NOT NULL,
+                start_char INTEGER NOT NULL,
+                end_char INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_clause_index_document ON clause_index(document_id);
+            CREATE TABLE IF NOT EXISTS clause_index_status(
+                document_id INTEGER PRIMARY KEY
+            );
+            """
+        )
+        conn.close()
+
+    def _load(self):
+        with self._lock:
+            for path in (self._vectors_path, self._lists_path):
+                if not os.path.exists(path):
+                    open(path, "wb").close()
+            self.count = 0
+            self.owners = np.zeros(0, dtype=np.int64)
+            self.centroids = None
+            self.trained_count = 0
+            self._meta_mtime = None
+            conn = self._conn()
+            self._sync(conn)
+            conn.close()
+
+    def _sync(self, conn):
+        """
+        Catch up with rows committed and training done by any process.
+        The database is authoritative: rows on disk past MAX(id) were never
+        committed and are ignored (and truncated by the next writer).
+        """
+        committed = conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM clause_index").fetchone()[0]
+        mtime = os.stat(self._meta_path).st_mtime_ns if os.path.exists(self._meta_path) else None
+        retrained = mtime != self._meta_mtime
+        if retrained:
+            self._meta_mtime = mtime
+            self.centroids = np.load(self._centroids_path) if mtime is not None else None
+            self.trained_count = 0
+            if mtime is not None:
+                with open(self._meta_path) as f:
+                    self.trained_count = json.load(f)["trained_count"]
+        grown = committed != self.count
+        if grown:
+            start = self.count if committed > self.count else 0
+            rows = conn.execute(
+                "SELECT c.id, COALESCE(d.user_id, -1) FROM clause_index c "
+                "LEFT JOIN documents d ON d.id = c.document_id WHERE c.id >= ?",
+                (start,),
+            ).fetchall()
+            owners = np.full(committed, -1, dtype=np.int64)
+            owners[:start] = self.owners[:start]
+            if rows:
+                pairs = np.array([tuple(r) for r in rows], dtype=np.int64)
+                owners[pairs[:, 0]] = pairs[:, 1]
+            self.owners, self.count = owners, committed
+        if retrained or grown:
+            self._map()
+
+    def refresh(self):
+        """Pick up clauses added by other processes since the last call."""
+        with self._lock:
+            conn = self._conn()
+            self._sync(conn)
+            conn.close()
+
+    @contextmanager
+    def _writing(self):
+        """
+        Hold the database write lock for the duration of a change to the
+        index files, so writers in different processes never interleave.
+        Yields a connection inside the open transaction.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._sync(conn)
+            yield conn
+            conn.commit()
+            self._sync(conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _map(self):
+        if self.count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self.count, DIM))
+            lists = np.fromfile(self._lists_path, dtype=np.int32, count=self.count)
+        else:
+            self._vectors = np.zeros((0, DIM), dtype=np.float16)
+            lists = np.zeros(0, dtype=np.int32)
+        if self.centroids is not None:
+            self._order = np.argsort(lists, kind="stable").astype(np.int64)
+            self._offsets = np.searchsorted(lists[self._order], np.arange(len(self.centroids) + 1))
+
+    # --- writes ---
+    def add(self, document_id: int, text: str) -> int:
+        """Embed and append one document's clauses. Returns the number of clauses added."""
+        return self.add_many([(document_id, text)])
+
+    def add_many(self, docs: list[tuple[int, str]]) -> int:
+        spans = [(doc_id, s, e, text[s:e]) for doc_id, text in docs for s, e in split_clauses(text or "")]
+        vectors = embed([t for *_, t in spans]) if spans else np.zeros((0, DIM), dtype=np.float32)
+        with self._lock:
+            with self._writing() as conn:
+                # Another process may have indexed some of these while we were embedding.
+                marks = ",".join("?" * len(docs))
+                done = {r[0] for r in conn.execute(
+                    f"SELECT document_id FROM clause_index_status WHERE document_id IN ({marks})",
+                    [doc_id for doc_id, _ in docs],
+                )} if docs else set()
+                if done:
+                    keep = [i for i, span in enumerate(spans) if span[0] not in done]
+                    spans, vectors = [spans[i] for i in keep], vectors[keep]
+                start = self.count
+                lists = (_nearest(vectors, self.centroids) if self.centroids is not None
+                         else np.full(len(vectors), -1, dtype=np.int32))
+                for path, data, width in ((self._vectors_path, vectors.astype(np.float16), DIM * 2),
+                                          (self._lists_path, lists.astype(np.int32), 4)):
+                    with open(path, "r+b") as f:
+                        f.truncate(start * width)   # drop rows a crashed writer never committed
+                        f.seek(0, os.SEEK_END)
+                        f.write(data.tobytes())
+                conn.executemany(
+                    "INSERT INTO clause_index(id, document_id, start_char, end_char) VALUES(?,?,?,?)",
+                    [(start + i, doc_id, s, e) for i, (doc_id, s, e, _) in enumerate(spans)],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO clause_index_status(document_id) VALUES(?)",
+                    [(doc_id,) for doc_id, _ in docs if doc_id not in done],
+                )
+            if self.count >= BRUTE_FORCE_LIMIT and (
+                self.centroids is None or self.count >= RETRAIN_GROWTH * self.trained_count
+            ):
+                self.train()
+        return len(spans)
+
+    def train(self):
+        """(Re)train the coarse quantizer and reassign every row."""
+        with self._lock, self._writing():
+            if not self.count:
+                return
+            vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self.count, DIM))
+            nlist = int(np.clip(4 * np.sqrt(self.count), 16, 4096))
+            rng = np.random.default_rng(0)
+            sample_idx = np.sort(rng.choice(self.count, min(self.count, 64 * nlist, 200_000), replace=False))
+            centroids = _train_centroids(np.asarray(vectors[sample_idx], dtype=np.float32), nlist)
+            # Readers in other processes only reload once meta.json changes, so it is replaced last.
+            _nearest(vectors, centroids).tofile(self._lists_path + ".tmp")
+            np.save(self._centroids_path + ".tmp.npy", centroids)
+            with open(self._meta_path + ".tmp", "w") as f:
+                json.dump({"trained_count": self.count, "nlist": nlist}, f)
+            os.replace(self._lists_path + ".tmp", self._lists_path)
+            os.replace(self._centroids_path + ".tmp.npy", self._centroids_path)
+            os.replace(self._meta_path + ".tmp", self._meta_path)
+
+    def index_new_documents(self, user_id: int | None = None, batch_docs: int = 64) -> int:
+        """Embed documents (optionally one user's) that are not in the index yet. Returns clauses added."""
+        sql = ("SELECT d.id FROM documents d LEFT JOIN clause_index_status s ON s.document_id = d.id "
+               "WHERE s.document_id IS NULL")
+        params = []
+        if user_id is not None:
+            sql += " AND d.user_id=?"
+            params.append(user_id)
+        conn = self._conn()
+        pending = [r["id"] for r in conn.execute(sql + " ORDER BY d.id", params)]
+        added = 0
+        for b in range(0, len(pending), batch_docs):
+            ids = pending[b:b + batch_docs]
+            marks = ",".join("?" * len(ids))
+            rows = conn.execute(f"SELECT id, content FROM documents WHERE id IN ({marks})", ids).fetchall()
+            added += self.add_many([(r["id"], r["content"]) for r in rows])
+        conn.close()
+        return added
+
+    # --- reads ---
+    def search_vector(self, query: np.ndarray, k: int = 10, nprobe: int = NPROBE,
+                      user_id: int | None = None) -> list[tuple[int, float]]:
+        """
+        [(row id, cosine score)] best first. With user_id only that user's
+        rows are ranked; if they are few enough they are scanned exactly
+        rather than through the IVF lists.
+        """
+        self.refresh()
+        with self._lock:
+            vectors, count, owners = self._vectors, self.count, self.owners
+            centroids = self.centroids
+            order, offsets = (self._order, self._offsets) if centroids is not None else (None, None)
+        if count == 0:
+            return []
+        query = query.astype(np.float32)
+        mine = np.flatnonzero(owners == user_id) if user_id is not None else None
+        if mine is not None and (centroids is None or len(mine) <= BRUTE_FORCE_LIMIT):
+            candidates = mine
+            scores = _score_rows(vectors, candidates, query)
+        elif centroids is None:
+            candidates = np.arange(count)
+            scores = np.concatenate([
+                np.asarray(vectors[s:s + 65536], dtype=np.float32) @ query for s in range(0, count, 65536)
+            ])
+        else:
+            nprobe = min(nprobe, len(centroids))
+            probe = np.argpartition(centroids @ query, -nprobe)[-nprobe:]
+            candidates = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probe])
+            if user_id is not None:
+                candidates = candidates[owners[candidates] == user_id]
+            candidates.sort()  # sequential reads from the memory map
+            scores = _score_rows(vectors, candidates, query)
+        k = min(k, len(candidates))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def search(self, text: str, k: int = 10, user_id: int | None = None) -> list[dict]:
+        """Clauses most similar to text, optionally limited to one user's documents."""
+        hits = self.search_vector(embed([text])[0], k=k, user_id=user_id)
+        if not hits:
+            return []
+        ids = [h[0] for h in hits]
+        marks = ",".join("?" * len(ids))
+        sql = (
+            "SELECT c.id, c.document_id, d.filename, "
+            "substr(d.content, c.start_char + 1, c.end_char - c.start_char) AS clause "
+            f"FROM clause_index c JOIN documents d ON d.id = c.document_id WHERE c.id IN ({marks})"
+        )
+        params = list(ids)
+        if user_id is not None:
+            sql += " AND d.user_id=?"
+            params.append(user_id)
+        conn = self._conn()
+        rows = {r["id"]: r for r in conn.execute(sql, params)}
+        conn.close()
+        results = []
+        for row_id, score in hits:
+            if row_id in rows:
+                r = rows[row_id]
+                results.append({"document_id": r["document_id"], "filename": r["filename"],
+                                "clause": r["clause"], "score": round(score, 4)})
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ClauseIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ClauseIndex()
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the semantic clause index.")
+    parser.add_argument("--rebuild", action="store_true", help="Retrain the IVF quantizer after indexing")
+    args = parser.parse_args(argv)
+    index = get_index()
+    added = index.index_new_documents()
+    if args.rebuild and index.count:
+        index.train()
+    print(f"Indexed {added} new clause(s); {index.count} total.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# doc_viewer.py
+# -------------------------------------------------------------
+# Paginated document viewer: only the visible window of
+# paragraphs is rendered and sent to the browser on each rerun.
+# -------------------------------------------------------------
+
+import html
+import re
+
+import streamlit as st
+
+# Bounds on what one page may send, whichever is hit first.
+PAGE_PARAGRAPHS = 40
+PAGE_CHARS = 20_000
+# Paragraphs longer than this (e.g. PDFs without blank lines) are cut up.
+MAX_PARAGRAPH_CHARS = 2_000
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# ---------------------------
+# Layout (cached per text)
+# ---------------------------
+@st.cache_data(max_entries=32, show_spinner=False)
+def split_paragraphs(text: str) -> list[str]:
+    paragraphs = []
+    for para in _PARAGRAPH_BREAK.split(text):
+        para = para.strip()
+        while len(para) > MAX_PARAGRAPH_CHARS:
+            cut = para.rfind(" ", 0, MAX_PARAGRAPH_CHARS)
+            cut = cut if cut > 0 else MAX_PARAGRAPH_CHARS
+            paragraphs.append(para[:cut])
+            para = para[cut:].lstrip()
+        if para:
+            paragraphs.append(para)
+    return paragraphs
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def page_bounds(text: str) -> list[tuple[int, int]]:
+    """(first, last+1) paragraph index of every page."""
+    bounds, start, chars = [], 0, 0
+    for i, para in enumerate(split_paragraphs(text)):
+        if i > start and (i - start >= PAGE_PARAGRAPHS or chars + len(para) > PAGE_CHARS):
+            bounds.append((start, i))
+            start, chars = i, 0
+        chars += len(para)
+    bounds.append((start, len(split_paragraphs(text))))
+    return bounds
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def align_summary(source: str, summary: str) -> list[tuple[str, int]]:
+    """
+    Map each summary sentence to the source paragraph it most likely came
+    from (share of the sentence's words found in the paragraph).
+    """
+    para_words = [set(_WORD.findall(p.lower())) for p in split_paragraphs(source)]
+    aligned = []
+    for sentence in _SENTENCE_SPLIT.split(summary.strip()):
+        words = set(_WORD.findall(sentence.lower()))
+        if not sentence or not words or not para_words:
+            continue
+        best = max(range(len(para_words)), key=lambda i: len(words & para_words[i]))
+        aligned.append((sentence, best))
+    return aligned
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+def _set_page(key: str, page: int):
+    st.session_state[f"{key}_page"] = page
+    st.session_state.pop(f"{key}_focus", None)
+
+
+def _focus(key: str, paragraph: int):
+    st.session_state[f"{key}_focus"] = paragraph
+
+
+def render_document(text: str, key: str, highlight=None, box_class: str = "output-box"):
+    """
+    Show one page of text with Prev/Next controls.
+    `highlight` (e.g. glossary highlight_terms) is applied to the visible
+    paragraphs only; without it the text is HTML-escaped.
+    """
+    paragraphs = split_paragraphs(text)
+    bounds = page_bounds(text)
+    focus = st.session_state.get(f"{key}_focus")
+    page = st.session_state.get(f"{key}_page", 0)
+    if focus is not None:
+        page = next(i for i, (s, e) in enumerate(bounds) if s <= focus < e)
+        st.session_state[f"{key}_page"] = page
+    page = min(page, len(bounds) - 1)
+    start, end = bounds[page]
+
+    parts = []
+    for i in range(start, end):
+        body = highlight(paragraphs[i]) if highlight else html.escape(paragraphs[i])
+        style = " style='background-color:#fff3bf'" if i == focus else ""
+        parts.append(f"<p id='{key}-p{i}'{style}>{body}</p>")
+    st.markdown(f"<div class='{box_class}'>{''.join(parts)}</div>", unsafe_allow_html=True)
+
+    if len(bounds) > 1:
+        prev_col, info_col, next_col = st.columns([0.2, 0.6, 0.2])
+        prev_col.button("◀ Prev", key=f"{key}_prev", disabled=page == 0,
+                        on_click=_set_page, args=(key, page - 1))
+        info_col.caption(f"Page {page + 1} of {len(bounds)} · paragraphs {start + 1}–{end} of {len(paragraphs)}")
+        next_col.button("Next ▶", key=f"{key}_next", disabled=page == len(bounds) - 1,
+                        on_click=_set_page, args=(key, page + 1))
+
+
+def render_aligned_summary(source: str, summary: str, source_key: str, box_class: str = "card"):
+    """
+    Show a summary sentence by sentence; each sentence can jump the source
+    viewer (rendered with render_document under source_key) to its origin.
+    """
+    aligned = align_summary(source, summary)
+    st.markdown(f"<div class='{box_class}'>{html.escape(summary)}</div>", unsafe_allow_html=True)
+    if len(page_bounds(source)) <= 1 or not aligned:
+        return
+    with st.expander("Find summary sentences in the original"):
+        for n, (sentence, paragraph) in enumerate(aligned):
+            col_text, col_btn = st.columns([0.85, 0.15])
+            col_text.write(sentence)
+            col_btn.button("Source", key=f"{source_key}_align_{n}",
+                           on_click=_focus, args=(source_key, paragraph))
@@ -0,0 +1,93 @@
+# encoder_cache.py
+# -------------------------------------------------------------
+# Bounded in-memory cache for per-text model work: token counts,
+# token ids and BART encoder hidden states, keyed by text hash.
+# Re-summarizing the same text with other length/beam settings
+# then only runs the decoder.
+# -------------------------------------------------------------
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Global cap on cached bytes (tensors are counted by their storage size).
+MEMORY_CAP_BYTES = int(os.environ.get("CLAUSEEASE_ENCODER_CACHE_MB", "256")) * 1024 * 1024
+
+_cache: OrderedDict = OrderedDict()   # key -> (value, size), least recently used first
+_cache_bytes = 0
+_lock = threading.Lock()
+stats: dict[str, dict] = {}           # key kind -> {"hits", "misses"}
+evictions = 0
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _nbytes(value) -> int:
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return value.element_size() * value.nelement()
+    if isinstance(value, Mapping):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _count(kind: str, field: str):
+    stats.setdefault(kind, {"hits": 0, "misses": 0})[field] += 1
+
+
+def cached(key: tuple, compute):
+    """
+    Value for `key` (kind, ..., text hash), calling compute() on a miss.
+    Concurrent misses on the same key may both compute; the last one wins.
+    Values larger than the whole cap are returned but not kept.
+    """
+    global _cache_bytes, evictions
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _count(key[0], "hits")
+            return entry[0]
+        _count(key[0], "misses")
+    value = compute()
+    size = _nbytes(value)
+    if size > MEMORY_CAP_BYTES:
+        return value
+    with _lock:
+        if key not in _cache:
+            _cache[key] = (value, size)
+            _cache_bytes += size
+        while _cache_bytes > MEMORY_CAP_BYTES:
+            _, (_, old_size) = _cache.popitem(last=False)
+            _cache_bytes -= old_size
+            evictions += 1
+    return value
+
+
+def clear():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def report() -> dict:
+    """Hit rate per kind of cached value plus overall memory use."""
+    with _lock:
+        kinds = {
+            kind: {**s, "hit_rate": round(s["hits"] / (s["hits"] + s["misses"]), 3) if s["hits"] + s["misses"] else None}
+            for kind, s in stats.items()
+        }
+        return {
+            "cache_bytes": _cache_bytes,
+            "cache_cap_bytes": MEMORY_CAP_BYTES,
+            "entries": len(_cache),
+            "evictions": evictions,
+            "kinds": kinds,
+        }
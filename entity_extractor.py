@@ -0,0 +1,251 @@
+# entity_extractor.py
+# -------------------------------------------------------------
+# Clause and entity extraction over the document library (spaCy)
+#
+#   python entity_extractor.py              # only new documents
+#   python entity_extractor.py --all        # re-extract everything
+# -------------------------------------------------------------
+
+import argparse
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+DB_PATH = "users.db"
+SPACY_MODEL = os.environ.get("CLAUSEEASE_SPACY_MODEL", "en_core_web_sm")
+
+# Only NER and sentence boundaries are needed; everything else is skipped.
+EXCLUDED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+# spaCy's default max_length is 1M chars; long contracts are split into chunks.
+CHUNK_CHARS = 50_000
+
+LABELS = {
+    "ORG": "PARTY",
+    "PERSON": "PARTY",
+    "DATE": "DATE",
+    "MONEY": "MONEY",
+}
+GOVERNING_LAW_RE = re.compile(r"\b(governed by|governing law|laws of)\b", re.I)
+TERMINATION_RE = re.compile(r"\bterminat(e|es|ed|ion)\b", re.I)
+
+
+# ---------------------------
+# Database
+# ---------------------------
+def get_conn():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_entity_tables(conn):
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS document_entities(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            text TEXT NOT NULL,
+            norm_text TEXT NOT NULL,
+            start_char INTEGER,
+            end_char INTEGER,
+            FOREIGN KEY(document_id) REFERENCES documents(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entities_label_text ON document_entities(label, norm_text);
+        CREATE INDEX IF NOT EXISTS idx_entities_document ON document_entities(document_id);
+        CREATE TABLE IF NOT EXISTS document_entity_status(
+            document_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            processed_at TEXT NOT NULL
+        );
+        """
+    )
+    conn.commit()
+
+
+def pending_documents(conn, include_all: bool = False, page_size: int = 100):
+    """
+    Yields (id, content) for documents that have not been extracted yet.
+    Read a page at a time so no cursor stays open while the caller commits.
+    """
+    if include_all:
+        sql = "SELECT id, content FROM documents WHERE id > ? ORDER BY id LIMIT ?"
+    else:
+        sql = (
+            "SELECT d.id, d.content FROM documents d "
+            "LEFT JOIN document_entity_status s ON s.document_id = d.id "
+            "WHERE s.document_id IS NULL AND d.id > ? ORDER BY d.id LIMIT ?"
+        )
+    last = -1
+    while True:
+        page = conn.execute(sql, (last, page_size)).fetchall()
+        for row in page:
+            yield row["id"], row["content"]
+        if len(page) < page_size:
+            return
+        last = page[-1]["id"]
+
+
+def delete_entities(conn, doc_id: int):
+    conn.execute("DELETE FROM document_entities WHERE document_id=?", (doc_id,))
+    conn.execute("DELETE FROM document_entity_status WHERE document_id=?", (doc_id,))
+
+
+# ---------------------------
+# Extraction
+# ---------------------------
+def load_nlp(model: str = SPACY_MODEL):
+    # Imported here so the Document Library queries don't pay for loading spaCy.
+    import spacy
+
+    nlp = spacy.load(model, exclude=EXCLUDED_PIPES)
+    if "senter" in nlp.disabled:
+        nlp.enable_pipe("senter")
+    elif not nlp.has_pipe("senter") and not nlp.has_pipe("parser"):
+        nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def _chunks(doc_id: int, text: str):
+    """Split on paragraph boundaries into pieces spaCy can handle, keeping offsets."""
+    start = 0
+    while start < len(text):
+        end = min(start + CHUNK_CHARS, len(text))
+        if end < len(text):
+            cut = text.rfind("\n", start, end)
+            end = cut + 1 if cut > start else end
+        yield text[start:end], (doc_id, start)
+        start = end
+
+
+def entities_from_doc(doc, offset: int = 0):
+    """Returns (label, text, start_char, end_char) rows for one spaCy Doc."""
+    rows = []
+    for ent in doc.ents:
+        label = LABELS.get(ent.label_)
+        if label:
+            rows.append((label, ent.text.strip(), offset + ent.start_char, offset + ent.end_char))
+    for sent in doc.sents:
+        if GOVERNING_LAW_RE.search(sent.text):
+            places = [e for e in sent.ents if e.label_ == "GPE"]
+            target = places[-1] if places else sent
+            rows.append(("GOVERNING_LAW", target.text.strip(), offset + target.start_char, offset + target.end_char))
+        if TERMINATION_RE.search(sent.text):
+            rows.append(("TERMINATION", sent.text.strip(), offset + sent.start_char, offset + sent.end_char))
+    return rows
+
+
+def extract_all(include_all: bool = False, n_process: int = 1, batch_size: int = 32,
+                commit_every: int = 200, nlp=None) -> int:
+    """
+    Run the pipeline over pending documents and store results.
+    Returns the number of documents processed.
+    """
+    nlp = nlp or load_nlp()
+    conn = get_conn()
+    init_entity_tables(conn)
+
+    remaining = {}
+    finished = []
+
+    def chunk_stream():
+        # One document's chunks are counted before any of them is handed to
+        # nlp.pipe, which may process a batch that ends mid-document.
+        for doc_id, text in pending_documents(conn, include_all):
+            chunks = list(_chunks(doc_id, text or ""))
+            if not chunks:
+                # Documents with no text produce no chunks but still count as processed.
+                finished.append(doc_id)
+                continue
+            remaining[doc_id] = len(chunks)
+            yield from chunks
+
+    rows = []
+    done = 0
+    for doc, (doc_id, offset) in nlp.pipe(chunk_stream(), as_tuples=True, n_process=n_process, batch_size=batch_size):
+        rows.extend((doc_id, label, text, text.lower(), s, e) for label, text, s, e in entities_from_doc(doc, offset))
+        remaining[doc_id] -= 1
+        if remaining[doc_id] == 0:
+            del remaining[doc_id]
+            finished.append(doc_id)
+        if len(finished) >= commit_every:
+            _flush(conn, rows, finished, include_all)
+            done += len(finished)
+            rows.clear()
+            finished.clear()
+    _flush(conn, rows, finished, include_all)
+    done += len(finished)
+    conn.close()
+    return done
+
+
+def _flush(conn, rows, finished, replace: bool):
+    with conn:
+        if replace:
+            conn.executemany("DELETE FROM document_entities WHERE document_id=?", [(d,) for d in finished])
+        conn.executemany(
+            "INSERT INTO document_entities(document_id, label, text, norm_text, start_char, end_char) "
+            "VALUES(?,?,?,?,?,?)",
+            rows,
+        )
+        now = datetime.utcnow().isoformat()
+        conn.executemany(
+            "INSERT OR REPLACE INTO document_entity_status(document_id, model, processed_at) VALUES(?,?,?)",
+            [(d, SPACY_MODEL, now) for d in finished],
+        )
+
+
+# ---------------------------
+# Queries for the Document Library
+# ---------------------------
+def documents_with_entity(user_id: int, label: str, prefix: str = "") -> set[int]:
+    """Ids of the user's documents having an entity of this label starting with prefix."""
+    prefix = prefix.strip().lower()
+    conn = get_conn()
+    init_entity_tables(conn)
+    # Range match on norm_text so the (label, norm_text) index is used.
+    rows = conn.execute(
+        "SELECT DISTINCT e.document_id FROM document_entities e "
+        "JOIN documents d ON d.id = e.document_id "
+        "WHERE e.label=? AND e.norm_text >= ? AND e.norm_text < ? AND d.user_id=?",
+        (label, prefix, prefix + "\uffff", user_id),
+    ).fetchall()
+    conn.close()
+    return {r["document_id"] for r in rows}
+
+
+def entities_for_documents(doc_ids: list[int]) -> dict[int, dict[str, list[str]]]:
+    """{doc_id: {label: [distinct texts]}} for rendering library cards."""
+    if not doc_ids:
+        return {}
+    conn = get_conn()
+    init_entity_tables(conn)
+    marks = ",".join("?" * len(doc_ids))
+    rows = conn.execute(
+        f"SELECT document_id, label, text FROM document_entities WHERE document_id IN ({marks}) "
+        "AND label != 'TERMINATION' ORDER BY start_char",
+        doc_ids,
+    ).fetchall()
+    conn.close()
+    result: dict[int, dict[str, list[str]]] = {}
+    for r in rows:
+        texts = result.setdefault(r["document_id"], {}).setdefault(r["label"], [])
+        if r["text"] not in texts:
+            texts.append(r["text"])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract parties, dates, amounts and key clauses.")
+    parser.add_argument("--all", action="store_true", help="Re-extract every document, not just new ones")
+    parser.add_argument("--n-process", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args(argv)
+    n = extract_all(args.all, args.n_process, args.batch_size)
+    print(f"Processed {n} document(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# inference_scheduler.py
+# -------------------------------------------------------------
+# CPU budgeting for torch inference. Concurrent generate() calls
+# are admitted through a scheduler that decides how many run at
+# once and how many intra-op threads each gets; tokenization and
+# PDF parsing run in their own pools pinned to reserved cores.
+#
+#   python inference_scheduler.py bench                      # 1/2/4/8 concurrent
+#   python inference_scheduler.py bench --slots 1 2 4 --save # and store profile for "auto"
+#
+# Configuration (environment):
+#   CLAUSEEASE_INFERENCE_POLICY   serial | partition | auto (default auto)
+#   CLAUSEEASE_INFERENCE_SLOTS    concurrent generations for "partition" (default 2)
+#   CLAUSEEASE_INFERENCE_CORES    cores for generation (default: all but the aux cores)
+#   CLAUSEEASE_AUX_CORES          cores reserved for tokenization/PDF pools (default 1)
+#   CLAUSEEASE_TOKENIZE_WORKERS   tokenization threads (default 2)
+#   CLAUSEEASE_PDF_WORKERS        PDF extraction processes (default 1)
+# -------------------------------------------------------------
+
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+
+# The Rust tokenizer would otherwise start its own thread per core.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+POLICIES = ("serial", "partition", "auto")
+PROFILE_PATH = os.path.join("models", "inference_profile.json")
+BENCH_PATH = os.path.join("loadtest", "inference_bench.json")
+
+
+def _available_cores() -> list[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    policy: str = "auto"
+    slots: int = 2
+    cores: int | None = None
+    aux_cores: int = 1
+    tokenize_workers: int = 2
+    pdf_workers: int = 1
+    profile_path: str = PROFILE_PATH
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        env = os.environ.get
+        cores = env("CLAUSEEASE_INFERENCE_CORES")
+        config = cls(
+            policy=env("CLAUSEEASE_INFERENCE_POLICY", "auto"),
+            slots=int(env("CLAUSEEASE_INFERENCE_SLOTS", "2")),
+            cores=int(cores) if cores else None,
+            aux_cores=int(env("CLAUSEEASE_AUX_CORES", "1")),
+            tokenize_workers=int(env("CLAUSEEASE_TOKENIZE_WORKERS", "2")),
+            pdf_workers=int(env("CLAUSEEASE_PDF_WORKERS", "1")),
+        )
+        if config.policy not in POLICIES:
+            raise ValueError(f"CLAUSEEASE_INFERENCE_POLICY must be one of {POLICIES}, got {config.policy!r}")
+        return config
+
+
+# ---------------------------
+# Auxiliary pools
+# ---------------------------
+def _pin(cores: list[int]):
+    """Restrict the calling thread (or worker process) to `cores`. Linux only."""
+    if cores:
+        try:
+            os.sched_setaffinity(0, cores)
+        except (AttributeError, OSError):
+            pass
+
+
+def _pdf_text(data: bytes) -> str:
+    from PyPDF2 import PdfReader
+
+    pages = []
+    for p in PdfReader(io.BytesIO(data)).pages:
+        try:
+            pages.append(p.extract_text() or "")
+        except Exception:
+            pages.append("")
+    return "\n".join(pages)
+
+
+# ---------------------------
+# Scheduler
+# ---------------------------
+def _set_torch_threads(n: int):
+    """
+    Applied in the generating thread right before generate(). With the
+    OpenMP backend the setting is per calling thread, so concurrent
+    requests can run with different budgets.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.get_num_threads() != n:
+        torch.set_num_threads(n)
+
+
+_interop_set = False
+
+
+def _limit_interop_threads():
+    """One inter-op thread: generate() has no independent ops worth overlapping."""
+    global _interop_set
+    if _interop_set:
+        return
+    _interop_set = True
+    try:
+        import torch
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        # RuntimeError: inter-op work already started in this process.
+        pass
+
+
+class InferenceScheduler:
+    """
+    Admits generate() calls. At most `slots` run at once; each admitted
+    request gets cores // min(slots, demand) threads, so a lone request
+    always runs with every core and a busy server splits them evenly
+    instead of oversubscribing. Waiting interactive requests are always
+    admitted before background ones.
+    """
+
+    def __init__(self, config: SchedulerConfig | None = None):
+        self.config = config or SchedulerConfig.from_env()
+        available = _available_cores()
+        aux = self.config.aux_cores if len(available) > self.config.aux_cores else 0
+        self.aux_cores = available[len(available) - aux:] if aux else []
+        self.cores = self.config.cores or max(1, len(available) - aux)
+        self.slots = self._resolve_slots()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = {False: 0, True: 0}   # keyed by background flag
+        self._tokenize_pool = None
+        self._pdf_pool = None
+        self._pool_lock = threading.Lock()
+        self._lanes: dict[int, threading.Lock] = {}   # id(tokenizer) -> lock; tokenizers are cached for the process
+        self._stats = {"requests": 0, "queued": 0, "queue_ms": 0.0, "threads": {}}
+
+    def _resolve_slots(self) -> int:
+        if self.config.policy == "serial":
+            return 1
+        if self.config.policy == "partition":
+            return max(1, min(self.config.slots, self.cores))
+        # auto: use the benchmark profile measured on this many cores, else run serially.
+        try:
+            with open(self.config.profile_path) as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            return 1
+        if profile.get("cores") != self.cores or not profile.get("throughput"):
+            return 1
+        best = max(profile["throughput"].items(), key=lambda kv: kv[1])[0]
+        return max(1, min(int(best), self.cores))
+
+    def threads_for(self, demand: int) -> int:
+        return max(1, self.cores // max(1, min(self.slots, demand)))
+
+    @contextmanager
+    def slot(self, background: bool = False):
+        """Wait for a generation slot; yields the intra-op thread count in use."""
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting[background] += 1
+            queued = self._running >= self.slots
+            while self._running >= self.slots or (background and self._waiting[False]):
+                self._cond.wait()
+            self._waiting[background] -= 1
+            self._running += 1
+            threads = self.threads_for(self._running + self._waiting[False] + self._waiting[True])
+            self._stats["requests"] += 1
+            self._stats["queued"] += queued
+            self._stats["queue_ms"] += (time.perf_counter() - start) * 1000
+            self._stats["threads"][threads] = self._stats["threads"].get(threads, 0) + 1
+        _limit_interop_threads()
+        _set_torch_threads(threads)
+        try:
+            yield threads
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    # --- auxiliary work ---
+    def _pools(self):
+        with self._pool_lock:
+            if self._tokenize_pool is None:
+                self._tokenize_pool = ThreadPoolExecutor(
+                    max_workers=self.config.tokenize_workers, thread_name_prefix="tokenize",
+                    initializer=_pin, initargs=(self.aux_cores,),
+                )
+                self._pdf_pool = ProcessPoolExecutor(
+                    max_workers=self.config.pdf_workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_pin, initargs=(self.aux_cores,),
+                )
+        return self._tokenize_pool, self._pdf_pool
+
+    def _lane(self, tokenizer) -> threading.Lock:
+        with self._pool_lock:
+            return self._lanes.setdefault(id(tokenizer), threading.Lock())
+
+    def tokenize(self, tokenizer, text, **kwargs):
+        """
+        tokenizer(text, **kwargs) on the tokenization pool. Calls on the same
+        tokenizer object are serialized: a fast tokenizer's truncation and
+        padding settings are mutable state, and concurrent calls with
+        different settings fail ("Already borrowed") or run untruncated.
+        """
+        lane = self._lane(tokenizer)
+
+        def run():
+            with lane:
+                return tokenizer(text, **kwargs)
+        return self._pools()[0].submit(run).result()
+
+    def extract_pdf(self, data: bytes) -> str:
+        """Text of a PDF given as bytes, parsed in the PDF worker process."""
+        return self._pools()[1].submit(_pdf_text, data).result()
+
+    def report(self) -> dict:
+        with self._cond:
+            s = dict(self._stats, threads=dict(self._stats["threads"]))
+            running, waiting = self._running, sum(self._waiting.values())
+        return {
+            "policy": self.config.policy,
+            "slots": self.slots,
+            "cores": self.cores,
+            "aux_cores": self.aux_cores,
+            "running": running,
+            "waiting": waiting,
+            "requests": s["requests"],
+            "queued": s["queued"],
+            "mean_queue_ms": round(s["queue_ms"] / s["requests"], 1) if s["requests"] else None,
+            "threads_used": s["threads"],
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            for pool in (self._tokenize_pool, self._pdf_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._tokenize_pool = self._pdf_pool = None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
+
+
+def configure(config: SchedulerConfig) -> InferenceScheduler:
+    """Replace the process-wide scheduler (used by the benchmark)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+        _scheduler = InferenceScheduler(config)
+        return _scheduler
+
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+_bench_ids = itertools.count()
+
+
+def _run_level(concurrency: int, requests: int, text: str, max_length: int) -> dict:
+    from summarization import abstractive_summarize
+
+    latencies = []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+                # A distinct text per request, so the token/encoder caches
+                # (encoder_cache.py) can't turn the run into a decoder-only one.
+                request_text = f"{text}\nReference {next(_bench_ids)}."
+            start = time.perf_counter()
+            abstractive_summarize(request_text, max_length=max_length)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+    }
+
+
+def benchmark(concurrency=(1, 2, 4, 8), slots=(1, 2, 4), requests: int | None = None,
+              text: str | None = None, max_length: int = 130) -> dict:
+    """
+    Aggregate throughput for each slot count (1 = serial with all cores)
+    at each concurrency level, through the real abstractive_summarize.
+    """
+    if text is None:
+        from load_test import SAMPLE_TEXT as text
+    base = SchedulerConfig.from_env()
+    results = {}
+    for n_slots in slots:
+        config = replace(base, policy="serial" if n_slots == 1 else "partition", slots=n_slots)
+        sched = configure(config)
+        # Warm-up: load weights and tokenizer outside the timed runs.
+        from summarization import abstractive_summarize
+        abstractive_summarize(text, max_length=max_length)
+        label = "serial" if n_slots == 1 else f"partition-{n_slots}"
+        results[label] = {
+            "slots": sched.slots,
+            "cores": sched.cores,
+            "levels": [_run_level(c, requests or max(8, 2 * c), text, max_length) for c in concurrency],
+        }
+        print(json.dumps({label: [(l["concurrency"], l["throughput_rps"]) for l in results[label]["levels"]]}))
+    configure(base)
+    return {"cores": results[next(iter(results))]["cores"] if results else None, "results": results}
+
+
+def save_profile(bench: dict, path: str = PROFILE_PATH):
+    """Throughput per slot count at the highest concurrency measured; read by policy "auto"."""
+    throughput = {
+        str(r["slots"]): max(r["levels"], key=lambda l: l["concurrency"])["throughput_rps"]
+        for r in bench["results"].values()
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"cores": bench["cores"], "throughput": throughput, "measured_at": time.time()}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent inference under different thread budgets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    p_bench.add_argument("--slots", type=int, nargs="+", default=[1, 2, 4])
+    p_bench.add_argument("--requests", type=int, help="Requests per level (default max(8, 2 x concurrency))")
+    p_bench.add_argument("--max-length", type=int, default=130)
+    p_bench.add_argument("--out", default=BENCH_PATH)
+    p_bench.add_argument("--save", action="store_true", help=f"Write {PROFILE_PATH} for the auto policy")
+    args = parser.parse_args(argv)
+
+    bench = benchmark(args.concurrency, args.slots, args.requests, max_length=args.max_length)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(bench, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.save:
+        save_profile(bench)
+        print(f"Wrote {PROFILE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# ingest_daemon.py
+# -------------------------------------------------------------
+# Watched-folder ingestion: files dropped into a directory
+# (by default contracts/) are parsed and saved to `documents`.
+#
+#   python ingest_daemon.py --user-id 1
+#   python ingest_daemon.py --user-id 1 --dir /mnt/cms-drop --summarize
+#   python ingest_daemon.py --user-id 1 --once      # scan, ingest, exit
+# -------------------------------------------------------------
+
+import argparse
+import logging
+import mimetypes
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import precompute
+import readability
+
+DB_PATH = "users.db"
+WATCH_DIR = "contracts"
+SUPPORTED = (".txt", ".docx", ".pdf")
+
+# A file is only picked up once it has had no events for DEBOUNCE_S
+# and its size/mtime did not change between two polls.
+DEBOUNCE_S = 2.0
+POLL_S = 0.5
+BATCH_SIZE = 200
+BATCH_WAIT_S = 1.0
+# A batch that hits "database is locked" is retried this many times (with
+# backoff) before its files are written one by one.
+WRITE_RETRIES = 3
+WRITE_RETRY_S = 1.0
+
+log = logging.getLogger("ingest")
+
+
+# ---------------------------
+# Text extraction (runs in worker processes)
+# ---------------------------
+def extract_text(path: str) -> str:
+    """Same formats as the upload page: TXT, DOCX and PDF."""
+    name_lower = path.lower()
+    if name_lower.endswith(".docx"):
+        from docx import Document as DocxDocument
+        doc = DocxDocument(path)
+        return "\n".join(p.text for p in doc.paragraphs)
+    if name_lower.endswith(".pdf"):
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        pages = []
+        for p in reader.pages:
+            try:
+                pages.append(p.extract_text() or "")
+            except Exception:
+                pages.append("")
+        return "\n".join(pages)
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+def _extract_job(path: str, size: int, mtime: float):
+    try:
+        return path, size, mtime, extract_text(path), None
+    except Exception as e:
+        return path, size, mtime, None, str(e)
+
+
+# ---------------------------
+# Database
+# ---------------------------
+def get_conn(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # WAL lets the Streamlit pages keep reading while batches are written.
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_tables(conn):
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS documents(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            filename TEXT,
+            mime TEXT,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        );
+        CREATE TABLE IF NOT EXISTS ingested_files(
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            document_id INTEGER,
+            error TEXT,
+            ingested_at TEXT NOT NULL
+        );
+        """
+    )
+    # Summary columns and the summary_jobs queue (used with --summarize).
+    precompute.init_tables(conn)
+    readability.init_readability_tables(conn)
+
+
+def load_seen(conn) -> dict[str, tuple[int, float]]:
+    return {r["path"]: (r["size"], r["mtime"]) for r in conn.execute("SELECT path, size, mtime FROM ingested_files")}
+
+
+# ---------------------------
+# Daemon
+# ---------------------------
+class IngestDaemon:
+    def __init__(self, watch_dir: str, user_id: int, workers: int | None = None,
+                 summarize: bool = False, db_path: str = DB_PATH):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.user_id = user_id
+        self.summarize = summarize
+        self.db_path = db_path
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.conn = get_conn(db_path)
+        init_tables(self.conn)
+        self.seen = load_seen(self.conn)
+        self.pending: dict[str, float] = {}      # path -> last event time
+        self.last_stat: dict[str, tuple] = {}     # path -> (size, mtime) at previous poll
+        self.in_flight: set[str] = set()
+        self.results: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.ingested = 0
+        self.failed = 0
+
+    # --- discovery ---
+    def touch(self, path: str):
+        """Record an event for path; it is processed once writes settle."""
+        if not path.lower().endswith(SUPPORTED) or os.path.basename(path).startswith("."):
+            return
+        with self.lock:
+            self.pending[os.path.abspath(path)] = time.monotonic()
+
+    def scan(self):
+        """Queue every file not ingested yet (or changed since) — used at startup."""
+        for root, _, files in os.walk(self.watch_dir):
+            for name in files:
+                self.touch(os.path.join(root, name))
+
+    def _ready(self) -> list[tuple[str, int, float]]:
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            for path, last_event in list(self.pending.items()):
+                if now - last_event < DEBOUNCE_S or path in self.in_flight:
+                    continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    self.pending.pop(path)
+                    self.last_stat.pop(path, None)
+                    continue
+                stat = (st.st_size, st.st_mtime)
+                if self.seen.get(path) == stat:
+                    self.pending.pop(path)
+                    continue
+                if self.last_stat.get(path) != stat:
+                    # Still being written (or first look): check again next poll.
+                    self.last_stat[path] = stat
+                    continue
+                self.pending.pop(path)
+                self.last_stat.pop(path, None)
+                self.in_flight.add(path)
+                ready.append((path, *stat))
+        return ready
+
+    def dispatch(self):
+        for path, size, mtime in self._ready():
+            future = self.pool.submit(_extract_job, path, size, mtime)
+            future.add_done_callback(lambda f, job=(path, size, mtime): self._collect(f, job))
+
+    def _collect(self, future, job):
+        try:
+            self.results.put(future.result())
+        except Exception as e:  # worker process died
+            self.results.put((*job, None, f"extraction failed: {e}"))
+
+    # --- writing ---
+    def _write_batch(self, batch):
+        now = datetime.utcnow().isoformat()
+        new_docs = {}
+        with self.conn:
+            for path, size, mtime, text, error in batch:
+                doc_id = None
+                if text is not None and text.strip():
+                    cur = self.conn.execute(
+                        "INSERT INTO documents(user_id, filename, mime, content, created_at) VALUES(?,?,?,?,?)",
+                        (self.user_id, os.path.basename(path),
+                         mimetypes.guess_type(path)[0] or "text/plain", text.strip(), now),
+                    )
+                    doc_id = cur.lastrowid
+                    new_docs[doc_id] = text.strip()
+                    if self.summarize:
+                        self.conn.execute(
+                            "INSERT OR IGNORE INTO summary_jobs(document_id, enqueued_at) VALUES(?,?)",
+                            (doc_id, now),
+                        )
+                elif error is None:
+                    error = "empty document"
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files(path, size, mtime, document_id, error, ingested_at) "
+                    "VALUES(?,?,?,?,?,?)",
+                    (path, size, mtime, doc_id, error, now),
+                )
+                if error:
+                    log.warning("Skipped %s: %s", path, error)
+            # Scored together: one vectorized pass per batch.
+            readability.store_many(self.conn, pd.Series(new_docs, dtype="object"))
+        with self.lock:
+            for path, size, mtime, *_ in batch:
+                self.seen[path] = (size, mtime)
+                self.in_flight.discard(path)
+        self.ingested += len(batch)
+
+    def _record_failure(self, item, error: Exception):
+        """Mark one file as failed so it is not retried until it changes."""
+        path, size, mtime, *_ = item
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files(path, size, mtime, document_id, error, ingested_at) "
+                    "VALUES(?,?,?,NULL,?,?)",
+                    (path, size, mtime, f"write failed: {error}", datetime.utcnow().isoformat()),
+                )
+            with self.lock:
+                self.seen[path] = (size, mtime)
+        except sqlite3.Error:
+            log.exception("Could not record failure for %s", path)
+        finally:
+            with self.lock:
+                self.in_flight.discard(path)
+            self.failed += 1
+
+    def _store(self, batch):
+        """_write_batch with retries; a batch that keeps failing is split up per file."""
+        for attempt in range(WRITE_RETRIES):
+            try:
+                self._write_batch(batch)
+                return
+            except sqlite3.OperationalError as e:
+                log.warning("Batch of %d file(s) not written (%s), retrying", len(batch), e)
+                time.sleep(WRITE_RETRY_S * 2 ** attempt)
+            except Exception:
+                log.exception("Batch of %d file(s) not written", len(batch))
+                break
+        for item in batch:
+            try:
+                self._write_batch([item])
+            except Exception as e:
+                log.exception("Could not store %s", item[0])
+                self._record_failure(item, e)
+
+    def writer(self):
+        """Collects extraction results and commits them in batched transactions."""
+        while not (self.stopping.is_set() and self.results.empty() and not self.in_flight):
+            batch = []
+            deadline = time.monotonic() + BATCH_WAIT_S
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.results.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch:
+                self._store(batch)
+                log.info("Ingested %d file(s) (%d total, %d failed)", len(batch), self.ingested, self.failed)
+
+    # --- lifecycle ---
+    def run(self, once: bool = False):
+        writer = threading.Thread(target=self.writer, name="ingest-writer", daemon=True)
+        writer.start()
+        self.scan()
+        observer = None
+        if not once:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+
+            daemon = self
+
+            class Handler(FileSystemEventHandler):
+                def on_created(self, event):
+                    if not event.is_directory:
+                        daemon.touch(event.src_path)
+
+                def on_modified(self, event):
+                    if not event.is_directory:
+                        daemon.touch(event.src_path)
+
+                def on_moved(self, event):
+                    if not event.is_directory:
+                        daemon.touch(event.dest_path)
+
+            observer = Observer()
+            observer.schedule(Handler(), self.watch_dir, recursive=True)
+            observer.start()
+            log.info("Watching %s", self.watch_dir)
+        try:
+            while True:
+                self.dispatch()
+                if once and not self.pending and not self.in_flight:
+                    break
+                time.sleep(POLL_S)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+            self.stopping.set()
+            writer.join()
+            self.pool.shutdown()
+            self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest contracts dropped into a directory.")
+    parser.add_argument("--dir", default=WATCH_DIR, help=f"Directory to watch (default: {WATCH_DIR})")
+    parser.add_argument("--user-id", type=int, required=True, help="Library owner for ingested documents")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--summarize", action="store_true", help="Queue background summaries for new documents")
+    parser.add_argument("--once", action="store_true", help="Ingest what is there now and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    IngestDaemon(args.dir, args.user_id, args.workers, args.summarize).run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
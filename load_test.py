@@ -0,0 +1,324 @@
+# load_test.py
+# -------------------------------------------------------------
+# Concurrent-session load test: N simulated users drive the real
+# pages headlessly through streamlit.testing.v1.AppTest.
+#
+#   python load_test.py --users 1 2 4 8 --journeys 3 --out loadtest/
+#   python load_test.py --users 4 --real-model
+# -------------------------------------------------------------
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+PAGES = {
+    "auth": os.path.join(REPO, "pages", "Auth.py"),
+    "main": os.path.join(REPO, "pages", "Main_App.py"),
+    "summarizer": os.path.join(REPO, "pages", "summarizer.py"),
+    "simplifier": os.path.join(REPO, "pages", "02_simplifier.py"),
+}
+# "simplify" is left out by default: pages/02_simplifier.py imports
+# utils.simplifier, which is not part of this tree, so the step always fails.
+DEFAULT_JOURNEY = ["login", "upload", "save", "summarize"]
+STEP_TIMEOUT_S = 120
+
+SAMPLE_TEXT = (
+    "This Agreement is entered into by and between the Supplier and the Customer. "
+    "The Supplier shall indemnify the Customer against all losses arising from any breach. "
+    "Either party may terminate this Agreement upon thirty days written notice. "
+    "This Agreement shall be governed by the laws of the State of New York. "
+) * 20
+
+
+_text_ids = itertools.count()
+
+
+def sample_text() -> str:
+    """SAMPLE_TEXT made unique per call, so the token/encoder caches never hit."""
+    return f"{SAMPLE_TEXT}\nReference {next(_text_ids)}."
+
+
+# ---------------------------
+# Deterministic model stub
+# ---------------------------
+class StubTokenizer:
+    """Whitespace 'tokenizer' with the call/decode surface abstractive_summarize uses."""
+
+    def __call__(self, text, return_tensors=None, max_length=None, truncation=False, **_):
+        ids = list(range(len(text.split())))
+        if truncation and max_length:
+            ids = ids[:max_length]
+        return {"input_ids": [ids] if return_tensors else ids}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return f"Stub summary of {len(ids)} tokens."
+
+
+class StubModel:
+    """
+    Sleeps for a fixed per-token cost so latency scales like the real thing:
+    the encoder pays per input token, generate() per output token.
+    """
+
+    def __init__(self, ms_per_input_token: float = 0.2, ms_per_output_token: float = 2.0):
+        self.ms_in = ms_per_input_token
+        self.ms_out = ms_per_output_token
+
+    def get_encoder(self):
+        def encode(input_ids, **_):
+            time.sleep(len(input_ids[0]) * self.ms_in / 1000)
+            return SimpleNamespace(last_hidden_state=list(input_ids[0]))
+        return encode
+
+    def generate(self, input_ids, max_length=130, num_beams=1, encoder_outputs=None, **_):
+        if encoder_outputs is None:
+            time.sleep(len(input_ids[0]) * self.ms_in / 1000)
+        time.sleep(max_length * self.ms_out * num_beams / 1000)
+        return [list(range(max_length // 2))]
+
+
+def install_model_stub():
+    import model_registry
+
+    stub = (StubTokenizer(), StubModel())
+    model_registry.load_checkpoint = lambda checkpoint: stub
+    model_registry.load_tokenizer = lambda checkpoint: StubTokenizer()
+
+
+# ---------------------------
+# Page drivers
+# ---------------------------
+def _by_label(widgets, label):
+    for w in widgets:
+        # FileUploader only exposes its label on the proto.
+        if getattr(w, "label", None) == label or w.proto.label == label:
+            return w
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _app(page: str, session: dict):
+    """Open a page with the simulated user's session state and run it once."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(PAGES[page], default_timeout=STEP_TIMEOUT_S)
+    for key, value in session.items():
+        at.session_state[key] = value
+    at.run()
+    _check(at)
+    return at
+
+
+def _check(at):
+    for exc in at.exception:
+        # Each page runs as its own entrypoint, so st.switch_page targets can't resolve;
+        # the page has done its work by the time it navigates away.
+        if "Could not find page" not in exc.message:
+            raise RuntimeError(exc.message)
+
+
+def step_login(session, user):
+    at = _app("auth", session)
+    _by_label(at.text_input, "Email").input(user["email"])
+    _by_label(at.text_input, "Password").input(user["password"])
+    _by_label(at.button, "Sign In").click().run()
+    _check(at)
+    if "auth_token" not in at.session_state:
+        raise RuntimeError("login failed")
+    session["user"] = at.session_state["user"]
+    session["auth_token"] = at.session_state["auth_token"]
+
+
+def step_save(session, user):
+    at = _app("main", session)
+    _by_label(at.text_area, "Paste text here (optional)").input(sample_text())
+    _by_label(at.button, "Save Document").click().run()
+    _check(at)
+
+
+def step_upload(session, user):
+    at = _app("main", session)
+    _by_label(at.file_uploader, "Or upload a file").upload(
+        "contract.txt", sample_text().encode("utf-8"), "text/plain"
+    ).run()
+    _check(at)
+    if not any(s.value.startswith("Parsed") for s in at.success):
+        raise RuntimeError("upload was not parsed")
+    _by_label(at.button, "Save Document").click().run()
+    _check(at)
+
+
+def step_summarize(session, user):
+    at = _app("summarizer", session)
+    _by_label(at.text_area, "Paste text here...").input(sample_text())
+    _by_label(at.button, "Generate Summary").click().run()
+    _check(at)
+
+
+def step_simplify(session, user):
+    at = _app("simplifier", session)
+    _by_label(at.text_area, "Paste or type your text below:").input(sample_text())
+    _by_label(at.button, "🔍 Simplify Text").click().run()
+    _check(at)
+
+
+STEPS = {
+    "login": step_login,
+    "upload": step_upload,
+    "save": step_save,
+    "summarize": step_summarize,
+    "simplify": step_simplify,
+}
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))], 1)
+
+
+def run_level(n_users: int, journeys: int, journey: list[str], users: list[dict]) -> dict:
+    """Run n_users concurrent sessions, each repeating the journey `journeys` times."""
+    samples: dict[str, list[float]] = {step: [] for step in journey}
+    errors: dict[str, list[str]] = {step: [] for step in journey}
+    lock = threading.Lock()
+
+    def simulate(user):
+        for _ in range(journeys):
+            session = {}
+            for step in journey:
+                start = time.perf_counter()
+                try:
+                    STEPS[step](session, user)
+                except Exception as e:
+                    with lock:
+                        errors[step].append(str(e))
+                    break
+                with lock:
+                    samples[step].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_users) as pool:
+        list(pool.map(simulate, users[:n_users]))
+    elapsed = time.perf_counter() - start
+
+    completed = sum(len(v) for v in samples.values())
+    return {
+        "users": n_users,
+        "elapsed_s": round(elapsed, 2),
+        "steps_per_s": round(completed / elapsed, 2) if elapsed else None,
+        "steps": {
+            step: {
+                "count": len(samples[step]),
+                "errors": len(errors[step]),
+                "first_error": errors[step][0] if errors[step] else None,
+                "mean_ms": round(statistics.mean(samples[step]), 1) if samples[step] else None,
+                "p50_ms": _percentile(samples[step], 0.50),
+                "p95_ms": _percentile(samples[step], 0.95),
+                "max_ms": round(max(samples[step]), 1) if samples[step] else None,
+            }
+            for step in journey
+        },
+    }
+
+
+def prepare_workspace(n_users: int) -> list[dict]:
+    """
+    Work in a scratch directory with a fresh users.db (pages use relative
+    paths) and register one account per simulated user.
+    """
+    workdir = tempfile.mkdtemp(prefix="clauseease-load-")
+    os.chdir(workdir)
+    if REPO not in sys.path:
+        sys.path.insert(0, REPO)
+    import auth_service
+    import backend
+
+    # Every journey logs in again; the per-account throttle would start
+    # rejecting a simulated user after a handful of journeys.
+    auth_service.EMAIL_LIMIT = auth_service.IP_LIMIT = (sys.maxsize, 1)
+    backend.init_db()
+    users = []
+    for i in range(n_users):
+        user = {"email": f"load{i}@example.com", "password": f"load-test-{i}"}
+        backend.add_user(user["email"], user["password"], f"Load{i}", "Tester")
+        users.append(user)
+    return users
+
+
+def write_html(results: list[dict], path: str):
+    """Minimal report: throughput and p95 per step against concurrent users."""
+    steps = list(results[0]["steps"]) if results else []
+    head = "".join(f"<th>{s} p50</th><th>{s} p95</th>" for s in steps)
+    rows = ""
+    for r in results:
+        cells = "".join(
+            f"<td>{r['steps'][s]['p50_ms']}</td><td>{r['steps'][s]['p95_ms']}</td>" for s in steps
+        )
+        rows += f"<tr><td>{r['users']}</td><td>{r['steps_per_s']}</td>{cells}</tr>"
+    # Throughput curve as an inline SVG polyline.
+    max_tp = max((r["steps_per_s"] or 0 for r in results), default=0) or 1
+    max_u = max((r["users"] for r in results), default=1)
+    points = " ".join(
+        f"{40 + 400 * r['users'] / max_u:.0f},{220 - 200 * (r['steps_per_s'] or 0) / max_tp:.0f}" for r in results
+    )
+    html = f"""<!doctype html><html><head><meta charset="utf-8"><title>ClauseEase load test</title>
+<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}td,th{{border:1px solid #ccc;padding:4px 8px}}</style>
+</head><body><h2>Throughput (steps/s) vs concurrent users</h2>
+<svg width="480" height="240"><line x1="40" y1="220" x2="460" y2="220" stroke="#999"/>
+<line x1="40" y1="20" x2="40" y2="220" stroke="#999"/>
+<polyline fill="none" stroke="#2563eb" stroke-width="2" points="{points}"/>
+<text x="45" y="15">{max_tp} steps/s</text><text x="420" y="235">{max_u} users</text></svg>
+<h2>Latency (ms)</h2><table><tr><th>users</th><th>steps/s</th>{head}</tr>{rows}</table>
+</body></html>"""
+    with open(path, "w") as f:
+        f.write(html)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit pages with simulated users.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrency levels")
+    parser.add_argument("--journeys", type=int, default=2, help="Journeys per user per level")
+    parser.add_argument("--journey", nargs="+", default=DEFAULT_JOURNEY, choices=list(STEPS))
+    parser.add_argument("--real-model", action="store_true", help="Use the real summarization models")
+    parser.add_argument("--out", default="loadtest", help="Directory for results.json and report.html")
+    args = parser.parse_args(argv)
+
+    out_dir = os.path.abspath(args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    users = prepare_workspace(max(args.users))
+    workdir = os.getcwd()
+    if not args.real_model:
+        install_model_stub()
+
+    results = []
+    try:
+        for n in args.users:
+            result = run_level(n, args.journeys, args.journey, users)
+            print(json.dumps({"users": n, "steps_per_s": result["steps_per_s"]}))
+            results.append(result)
+    finally:
+        os.chdir(REPO)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump({"journey": args.journey, "stub_model": not args.real_model, "levels": results}, f, indent=2)
+    write_html(results, os.path.join(out_dir, "report.html"))
+    print(f"Wrote {out_dir}/results.json and report.html")
+
+
+if __name__ == "__main__":
+    main()
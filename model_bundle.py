@@ -0,0 +1,226 @@
+# model_bundle.py
+# -------------------------------------------------------------
+# Local model bundles: prebuilt directories with memory-mapped
+# safetensors weights and a pre-serialized tokenizer.
+#
+#   python model_bundle.py build facebook/bart-large-cnn
+#   python model_bundle.py verify models/facebook--bart-large-cnn
+#   python model_bundle.py load models/facebook--bart-large-cnn
+# -------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+
+import torch
+from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer, GenerationConfig
+
+BUNDLE_ROOT = os.environ.get("CLAUSEEASE_MODEL_DIR", "models")
+MANIFEST = "bundle.json"
+WEIGHTS = "model.safetensors"
+BUNDLE_VERSION = 1
+
+_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def bundle_path(checkpoint: str, root: str = BUNDLE_ROOT) -> str:
+    """Directory a checkpoint's bundle lives in, e.g. models/facebook--bart-large-cnn."""
+    return os.path.join(root, checkpoint.replace("/", "--"))
+
+
+def is_bundle(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------------------------
+# Build / verify
+# ---------------------------
+def build_bundle(checkpoint: str, out_dir: str | None = None) -> str:
+    """
+    Download (or read from the HF cache) a checkpoint once and write it as a
+    self-contained bundle: config, fast tokenizer, a single safetensors file
+    and a manifest with file hashes.
+    """
+    out_dir = out_dir or bundle_path(checkpoint)
+    os.makedirs(out_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(checkpoint, use_fast=True)
+    model = AutoModelForSeq2SeqLM.from_pretrained(checkpoint)
+    tokenizer.save_pretrained(out_dir)
+    model.save_pretrained(out_dir, safe_serialization=True, max_shard_size="100GB")
+
+    files = sorted(f for f in os.listdir(out_dir) if f != MANIFEST)
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "checkpoint": checkpoint,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {f: _sha256(os.path.join(out_dir, f)) for f in files},
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return out_dir
+
+
+def verify_bundle(path: str) -> list[str]:
+    """Returns a list of problems; empty means the bundle is usable."""
+    if not is_bundle(path):
+        return [f"{path}: missing {MANIFEST}"]
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    problems = []
+    if manifest.get("version") != BUNDLE_VERSION:
+        problems.append(f"unsupported bundle version {manifest.get('version')}")
+    # generation_config.json carries the decoding defaults (no_repeat_ngram_size,
+    # forced_bos_token_id, length_penalty, ...) that save_pretrained moves out of config.json.
+    for name in (WEIGHTS, "config.json", "generation_config.json", "tokenizer.json"):
+        if name not in manifest["files"]:
+            problems.append(f"{name} not in bundle")
+    for name, digest in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.isfile(file_path):
+            problems.append(f"{name} missing")
+        elif _sha256(file_path) != digest:
+            problems.append(f"{name} checksum mismatch")
+    if not problems:
+        try:
+            _read_header(os.path.join(path, WEIGHTS))
+        except (ValueError, struct.error) as e:
+            problems.append(f"{WEIGHTS} unreadable: {e}")
+    return problems
+
+
+# ---------------------------
+# Load
+# ---------------------------
+def _read_header(weights_path: str) -> tuple[dict, int]:
+    with open(weights_path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+    return header, 8 + header_len
+
+
+def mmap_state_dict(weights_path: str) -> dict[str, torch.Tensor]:
+    """
+    Map a safetensors file read-only-in-practice (MAP_PRIVATE) and return
+    tensors that are views into the mapping. Pages come from the OS page
+    cache, so every process loading the same bundle shares one copy.
+    """
+    header, data_start = _read_header(weights_path)
+    nbytes = os.path.getsize(weights_path)
+    storage = torch.UntypedStorage.from_file(weights_path, shared=False, nbytes=nbytes)
+
+    state = {}
+    for name, info in header.items():
+        dtype = _DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        offset = data_start + begin
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        if offset % itemsize:
+            # Misaligned tensor: fall back to a private copy.
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, offset, (end - begin,))
+            state[name] = raw.clone().view(dtype).reshape(info["shape"])
+        else:
+            state[name] = torch.empty(0, dtype=dtype).set_(
+                storage, offset // itemsize, info["shape"]
+            )
+    return state
+
+
+def load_bundle(path: str):
+    """
+    Load (tokenizer, model) from a bundle without any network access.
+    The model skeleton is created on the meta device and its parameters
+    are assigned straight from the memory-mapped weights, so nothing is
+    deserialized or copied at startup.
+    """
+    config = AutoConfig.from_pretrained(path, local_files_only=True)
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True, use_fast=True)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(config)
+    state = mmap_state_dict(os.path.join(path, WEIGHTS))
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    # from_config only knows config.json; without this the bundle would decode
+    # with library defaults instead of the checkpoint's generation settings.
+    model.generation_config = GenerationConfig.from_pretrained(path, local_files_only=True)
+
+    still_meta = [n for n, p in list(model.named_parameters()) + list(model.named_buffers()) if p.is_meta]
+    if still_meta:
+        raise RuntimeError(f"Bundle {path} is missing weights for: {', '.join(still_meta[:5])}")
+    model.eval()
+    return tokenizer, model
+
+
+# ---------------------------
+# Startup report
+# ---------------------------
+def memory_report() -> dict:
+    """Resident memory split into anonymous (private) and file-backed (shareable) pages, in MB."""
+    report = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    report[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        report["MaxRSS"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def timed_load(path: str):
+    """load_bundle plus a dict with load time and memory after loading."""
+    start = time.perf_counter()
+    tokenizer, model = load_bundle(path)
+    report = {"bundle": path, "load_s": round(time.perf_counter() - start, 3), **memory_report()}
+    return tokenizer, model, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, verify and load local model bundles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="Build a bundle from a Hugging Face checkpoint")
+    p_build.add_argument("checkpoint")
+    p_build.add_argument("--out", help=f"Output directory (default: {BUNDLE_ROOT}/<checkpoint>)")
+    p_verify = sub.add_parser("verify", help="Check bundle files and checksums")
+    p_verify.add_argument("path")
+    p_load = sub.add_parser("load", help="Load a bundle and report startup time and memory")
+    p_load.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        out = build_bundle(args.checkpoint, args.out)
+        problems = verify_bundle(out)
+        print(f"Built {out}" if not problems else "\n".join(problems))
+        return 1 if problems else 0
+    if args.command == "verify":
+        problems = verify_bundle(args.path)
+        print("OK" if not problems else "\n".join(problems))
+        return 1 if problems else 0
+    if args.command == "load":
+        _, _, report = timed_load(args.path)
+        print(json.dumps(report, indent=2))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
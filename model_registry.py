@@ -0,0 +1,263 @@
+# model_registry.py
+# -------------------------------------------------------------
+# Abstractive model registry and per-request selection policy
+# -------------------------------------------------------------
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import encoder_cache
+from inference_scheduler import get_scheduler
+
+
+# ---------------------------
+# Registry
+# ---------------------------
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    One generation configuration: a checkpoint plus decoding settings.
+    Several specs may share a checkpoint (e.g. greedy vs beam search);
+    the weights are only loaded once per checkpoint.
+    """
+    name: str
+    checkpoint: str
+    num_beams: int
+    # Rough CPU cost used by the latency policy, refined from observed timings.
+    encode_ms_per_token: float
+    decode_ms_per_token: float
+
+    def estimate_ms(self, input_tokens: int, max_length: int) -> float:
+        base = self.encode_ms_per_token * input_tokens + self.decode_ms_per_token * max_length * self.num_beams
+        return base * _correction.get(self.name, 1.0)
+
+
+# Ordered from cheapest to most expensive.
+MODEL_REGISTRY = {
+    spec.name: spec
+    for spec in (
+        ModelSpec("distilbart-greedy", "sshleifer/distilbart-cnn-6-6", 1, 0.4, 9.0),
+        ModelSpec("distilbart-beam", "sshleifer/distilbart-cnn-12-6", 2, 0.6, 10.0),
+        ModelSpec("bart-large-greedy", "facebook/bart-large-cnn", 1, 1.2, 18.0),
+        ModelSpec("bart-large-beam", "facebook/bart-large-cnn", 4, 1.2, 18.0),
+    )
+}
+
+DEFAULT_MODEL = "bart-large-beam"
+
+# Input length tiers (in BART tokens) and the models worth using for each,
+# best quality first. Short clauses never touch the large model.
+SHORT_INPUT_TOKENS = 200
+LONG_INPUT_TOKENS = 600
+TIER_CANDIDATES = {
+    "short": ["distilbart-greedy"],
+    "medium": ["distilbart-beam", "distilbart-greedy"],
+    "long": ["bart-large-beam", "bart-large-greedy", "distilbart-beam", "distilbart-greedy"],
+}
+
+# All registered checkpoints share the BART vocabulary, so any of them can count tokens.
+_COUNTING_CHECKPOINT = MODEL_REGISTRY["distilbart-greedy"].checkpoint
+
+
+# ---------------------------
+# Loading (cached per checkpoint)
+# ---------------------------
+_loaded: dict[str, tuple] = {}
+_load_lock = threading.Lock()
+startup_reports: dict[str, dict] = {}
+
+
+def load_checkpoint(checkpoint: str):
+    """
+    Load and cache (tokenizer, model) for a checkpoint in inference mode.
+    A local bundle (see model_bundle.py) is preferred when one exists; it
+    loads without touching the network and shares weights via the page cache.
+    """
+    # Imported on first load so the registry itself stays cheap to import.
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    from model_bundle import bundle_path, is_bundle, memory_report, timed_load
+
+    with _load_lock:
+        if checkpoint not in _loaded:
+            bundle = bundle_path(checkpoint)
+            if is_bundle(bundle):
+                tokenizer, model, report = timed_load(bundle)
+            else:
+                start = time.perf_counter()
+                tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+                model = AutoModelForSeq2SeqLM.from_pretrained(checkpoint)
+                model.eval()
+                report = {"bundle": None, "load_s": round(time.perf_counter() - start, 3), **memory_report()}
+            startup_reports[checkpoint] = report
+            _loaded[checkpoint] = (tokenizer, model)
+        return _loaded[checkpoint]
+
+
+def load_model(name: str = DEFAULT_MODEL):
+    """Returns (spec, tokenizer, model) for a registry entry."""
+    spec = MODEL_REGISTRY[name]
+    tokenizer, model = load_checkpoint(spec.checkpoint)
+    return spec, tokenizer, model
+
+
+_tokenizers: dict[str, object] = {}
+
+
+def load_tokenizer(checkpoint: str):
+    """
+    A tokenizer on its own, without the model weights (e.g. for counting).
+    Deliberately a separate instance from the one load_checkpoint returns,
+    so counting never shares truncation state with generation.
+    """
+    from transformers import AutoTokenizer
+    from model_bundle import bundle_path, is_bundle
+
+    with _load_lock:
+        if checkpoint not in _tokenizers:
+            bundle = bundle_path(checkpoint)
+            if is_bundle(bundle):
+                _tokenizers[checkpoint] = AutoTokenizer.from_pretrained(bundle, local_files_only=True)
+            else:
+                _tokenizers[checkpoint] = AutoTokenizer.from_pretrained(checkpoint)
+        return _tokenizers[checkpoint]
+
+
+# Selection only looks at min(tokens, 1024), so counting stops just past that.
+COUNT_LIMIT = 1025
+# No BPE token is anywhere near this many characters long, so a prefix of
+# COUNT_LIMIT * COUNT_CHARS_PER_TOKEN characters still holds COUNT_LIMIT tokens.
+COUNT_CHARS_PER_TOKEN = 16
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text, capped at COUNT_LIMIT; long documents cost no more than short ones."""
+    tokenizer = load_tokenizer(_COUNTING_CHECKPOINT)
+    prefix = text[:COUNT_LIMIT * COUNT_CHARS_PER_TOKEN]
+    return encoder_cache.cached(
+        ("count", encoder_cache.text_key(text)),
+        lambda: len(get_scheduler().tokenize(
+            tokenizer, prefix, truncation=True, max_length=COUNT_LIMIT,
+        )["input_ids"]),
+    )
+
+
+# ---------------------------
+# Queue depth tracking
+# ---------------------------
+_inflight = 0
+_inflight_interactive = 0
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def track_request(background: bool = False):
+    """
+    Counts a generation as in flight so the policy can see current load.
+    Background work (see precompute.py) is counted separately so it can
+    get out of the way of interactive requests.
+    """
+    global _inflight, _inflight_interactive
+    with _inflight_lock:
+        _inflight += 1
+        _inflight_interactive += 0 if background else 1
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+            _inflight_interactive -= 0 if background else 1
+
+
+def queue_depth() -> int:
+    return _inflight
+
+
+def interactive_depth() -> int:
+    return _inflight_interactive
+
+
+# ---------------------------
+# Selection policy
+# ---------------------------
+def input_tier(input_tokens: int) -> str:
+    if input_tokens <= SHORT_INPUT_TOKENS:
+        return "short"
+    if input_tokens <= LONG_INPUT_TOKENS:
+        return "medium"
+    return "long"
+
+
+def select_model(input_tokens: int, max_length: int = 130, latency_budget_ms: float | None = None,
+                 depth: int | None = None) -> ModelSpec:
+    """
+    Pick a registry entry for one request.
+    The length tier decides which models are worth considering; the latency
+    budget (shared with every request already in flight) decides how far down
+    that list we have to go. Falls back to the cheapest model.
+    """
+    candidates = [MODEL_REGISTRY[n] for n in TIER_CANDIDATES[input_tier(input_tokens)]]
+    if latency_budget_ms is None:
+        return candidates[0]
+
+    depth = queue_depth() if depth is None else depth
+    effective_budget = latency_budget_ms / (1 + depth)
+    tokens = min(input_tokens, 1024)
+    for spec in candidates:
+        if spec.estimate_ms(tokens, max_length) <= effective_budget:
+            return spec
+    return MODEL_REGISTRY["distilbart-greedy"]
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+_correction: dict[str, float] = {}
+_selections: deque = deque(maxlen=1000)
+_metrics_lock = threading.Lock()
+
+
+def record_selection(spec: ModelSpec, input_tokens: int, max_length: int, depth: int,
+                     latency_budget_ms: float | None, elapsed_ms: float, encoder_cached: bool = False):
+    """
+    Store the choice and feed the observed latency back into the cost estimate.
+    Runs that reused cached encoder states (see encoder_cache.py) skipped part
+    of the estimated work, so they are recorded but don't adjust the estimate.
+    """
+    estimate = spec.estimate_ms(min(input_tokens, 1024), max_length)
+    with _metrics_lock:
+        _selections.append({
+            "ts": time.time(),
+            "model": spec.name,
+            "input_tokens": input_tokens,
+            "queue_depth": depth,
+            "latency_budget_ms": latency_budget_ms,
+            "estimated_ms": round(estimate, 1),
+            "elapsed_ms": round(elapsed_ms, 1),
+            "encoder_cached": encoder_cached,
+        })
+        if estimate > 0 and not encoder_cached:
+            # Exponentially weighted ratio of observed to estimated cost.
+            ratio = elapsed_ms / (estimate / _correction.get(spec.name, 1.0))
+            _correction[spec.name] = 0.8 * _correction.get(spec.name, ratio) + 0.2 * ratio
+
+
+def selection_stats() -> dict:
+    """Per-model request counts and mean latency over the recent window."""
+    with _metrics_lock:
+        rows = list(_selections)
+    stats = {}
+    for row in rows:
+        s = stats.setdefault(row["model"], {"requests": 0, "total_ms": 0.0})
+        s["requests"] += 1
+        s["total_ms"] += row["elapsed_ms"]
+    for s in stats.values():
+        s["mean_ms"] = round(s.pop("total_ms") / s["requests"], 1)
+    return stats
+
+
+def recent_selections(limit: int = 50) -> list[dict]:
+    with _metrics_lock:
+        return list(_selections)[-limit:]
@@ -2,6 +2,10 @@ import streamlit as st
 from utils.simplifier import simplify_text
 from utils.glossary_manager import load_glossary, highlight_terms, inject_glossary_styles
 import os
+import blob_store
+from request_log import Stages, log_request
+from doc_viewer import render_document
+from inference_scheduler import get_scheduler
 
 # ---------------------------
 # Page Config
@@ -80,12 +84,7 @@ if uploaded_file:
             doc = Document(uploaded_file)
             extracted_text = "\n".join([p.text for p in doc.paragraphs])
         elif ext == ".pdf":
-            from PyPDF2 import PdfReader
-            reader = PdfReader(uploaded_file)
-            pages = []
-            for p in reader.pages:
-                pages.append(p.extract_text() or "")
-            extracted_text = "\n".join(pages)
+            extracted_text = get_scheduler().extract_pdf(uploaded_file.getvalue())
     except Exception as e:
         st.error(f"⚠️ Failed to read file: {e}")
 
@@ -97,24 +96,30 @@ final_text = (text_input.strip() or extracted_text.strip())
 # ---------------------------
 if st.button("🔍 Simplify Text"):
     if final_text:
+        stages = Stages()
         with st.spinner("Simplifying... Please wait ⏳"):
-            simplified_output = simplify_text(final_text, level)
-
-        # Highlight glossary terms in original text
-        highlighted_text = highlight_terms(final_text, glossary)
-
-        # Display Output Columns — Contribution by Purvesh Patil
-        # This section shows original and simplified text side by side
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("<div class='title'>📄 Original Text</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='output-box'>{highlighted_text}</div>", unsafe_allow_html=True)
-
-        with col2:
-            st.markdown(f"<div class='title'>🔹 Simplified Text ({level} Level)</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='output-box'>{simplified_output}</div>", unsafe_allow_html=True)
-
+            with stages("simplify"):
+                simplified_output = simplify_text(final_text, level)
+        log_request("simplify", {"level": level}, final_text, simplified_output, stages)
+        # Kept across reruns so paging through the panes doesn't lose the result.
+        blob_store.session_put("simplify_result", {"source": final_text, "output": simplified_output, "level": level})
+        for k in ("simp_source_page", "simp_output_page"):
+            st.session_state.pop(k, None)
     else:
         st.warning("⚠️ Please enter text or upload a document before simplifying.")
 
+result = blob_store.session_get("simplify_result")
+if result:
+    # Display Output Columns — Contribution by Purvesh Patil
+    # This section shows original and simplified text side by side,
+    # one page at a time; glossary terms are highlighted on the visible page only.
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("<div class='title'>📄 Original Text</div>", unsafe_allow_html=True)
+        render_document(result["source"], key="simp_source",
+                        highlight=lambda para: highlight_terms(para, glossary))
+
+    with col2:
+        st.markdown(f"<div class='title'>🔹 Simplified Text ({result['level']} Level)</div>", unsafe_allow_html=True)
+        render_document(result["output"], key="simp_output")
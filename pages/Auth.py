@@ -5,7 +5,7 @@
 
 import streamlit as st
 import backend # Import the new backend module
-import bcrypt # Needed for password hashing, used in app.py
+import auth_service # Hashing pool, throttling and session tokens
 from forgot_password import show_forgot_password_page # Import the function
 
 # ---------------------------
@@ -39,14 +39,19 @@ if st.session_state.auth_view == 'login':
             password = st.text_input("Password", type="password", placeholder="••••••••")
             submitted = st.form_submit_button("Sign In", type="primary")
             if submitted:
-                # Get user data from the backend using the email
-                data = backend.get_user(email)
-                if data and bcrypt.checkpw(password.encode(), data[4]):
-                    st.session_state.user = {"id": data[0], "first_name": data[1], "email": data[3]}
-                    st.success("Login successful. You can now access the app.")
-                    st.switch_page("pages/Main_App.py")
+                # Verify credentials in the auth worker pool
+                try:
+                    user = auth_service.authenticate(email, password, getattr(st.context, "ip_address", None))
+                except (auth_service.AuthThrottled, auth_service.AuthBusy) as e:
+                    st.error(str(e))
                 else:
-                    st.error("Invalid email or password.")
+                    if user:
+                        st.session_state.user = user
+                        st.session_state.auth_token = auth_service.issue_token(user)
+                        st.success("Login successful. You can now access the app.")
+                        st.switch_page("pages/Main_App.py")
+                    else:
+                        st.error("Invalid email or password.")
                 
         
         st.markdown("---")
@@ -5,7 +5,12 @@
 
 import streamlit as st
 import sqlite3
-import bcrypt # Needed for a shared module
+import auth_service
+import entity_extractor
+import precompute
+import readability
+from inference_scheduler import get_scheduler
+from request_log import Stages, log_request
 from datetime import datetime
 import os
 
@@ -52,24 +57,32 @@ def init_db():
         );
         """
     )
-    conn.commit()
+    entity_extractor.init_entity_tables(conn)
+    precompute.init_tables(conn)
+    readability.init_readability_tables(conn)
     conn.close()
 
 def save_document(user_id: int, content: str, filename: str | None, mime: str | None):
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute(
+    cur = conn.execute(
         "INSERT INTO documents(user_id, filename, mime, content, created_at) VALUES(?,?,?,?,?)",
         (user_id, filename, mime, content, datetime.utcnow().isoformat()),
     )
+    readability.store(conn, cur.lastrowid, content)
     conn.commit()
+    # Summaries are filled in by the background worker (see precompute.py).
+    precompute.schedule(conn, cur.lastrowid)
     conn.close()
+    return cur.lastrowid
 
 def list_documents(user_id: int):
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
-        "SELECT id, filename, mime, content, created_at FROM documents WHERE user_id=? ORDER BY id DESC",
+        "SELECT id, filename, mime, content, created_at, summary_hybrid, summary_abstractive, summary_model, "
+        "flesch, grade_level "
+        "FROM documents WHERE user_id=? ORDER BY id DESC",
         (user_id,),
     ).fetchall()
     conn.close()
@@ -78,7 +91,10 @@ def list_documents(user_id: int):
 def delete_document(doc_id: int, user_id: int):
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute("DELETE FROM documents WHERE id=? AND user_id=?", (doc_id, user_id))
+    cur = conn.execute("DELETE FROM documents WHERE id=? AND user_id=?", (doc_id, user_id))
+    if cur.rowcount:
+        entity_extractor.delete_entities(conn, doc_id)
+        readability.delete_readability(conn, doc_id)
     conn.commit()
     conn.close()
 
@@ -109,14 +125,8 @@ def read_text_from_upload(uploaded_file) -> tuple[str, str, str]:
     if name_lower.endswith(".pdf"):
         if PdfReader is None:
             raise RuntimeError("PyPDF2 not installed. Run: pip install PyPDF2")
-        reader = PdfReader(uploaded_file)
-        pages = []
-        for p in reader.pages:              
-            try:                      
-                pages.append(p.extract_text() or "")
-            except Exception:
-                pages.append("")
-        text = "\n".join(pages)
+        # Parsed in the PDF worker process, off the inference cores.
+        text = get_scheduler().extract_pdf(uploaded_file.getvalue())
         return text, filename, mime
 
     try:
@@ -130,11 +140,10 @@ def read_text_from_upload(uploaded_file) -> tuple[str, str, str]:
 # ---------------------------
 
 init_db()
+precompute.ensure_worker()
 
 # Check for a logged-in user and redirect if not found
-if "user" not in st.session_state or st.session_state.user is None:
-    st.warning("Please login to access this page.")
-    st.stop()
+auth_service.require_login()
 
 if "user" in st.session_state and st.session_state.user:
     # st.title(f"Welcome!")
@@ -145,7 +154,7 @@ else:
 st.button("Log out", on_click=lambda: st.switch_page("main.py"))
 
 st.markdown("## Main Application")
-tab_upload, tab_docs = st.tabs(["Upload Document", "Document Library"])
+tab_upload, tab_docs, tab_search = st.tabs(["Upload Document", "Document Library", "Similar Clauses"])
 
 with tab_upload:
     st.markdown("### Upload Document")
@@ -172,28 +181,60 @@ with tab_upload:
         if not final_text:
             st.error("No content to save. Paste text or upload a file first.")
         else:
-            save_document(
-                st.session_state.user["id"],
-                final_text,
-                filename or "pasted_text.txt",
-                mime or "text/plain",
-            )
+            stages = Stages()
+            with stages("db_write"):
+                save_document(
+                    st.session_state.user["id"],
+                    final_text,
+                    filename or "pasted_text.txt",
+                    mime or "text/plain",
+                )
+            log_request("save", {"filename": filename or "pasted_text.txt", "mime": mime or "text/plain"},
+                        final_text, stages=stages)
             st.success("Document saved to your library.")
 
 with tab_docs:
     st.markdown("### Document Library")
     docs = list_documents(st.session_state.user["id"])
+
+    # Filter by extracted entities (see entity_extractor.py)
+    fcol1, fcol2 = st.columns([0.3, 0.7])
+    entity_label = fcol1.selectbox(
+        "Filter by", ["—", "PARTY", "DATE", "MONEY", "GOVERNING_LAW", "TERMINATION"]
+    )
+    entity_query = fcol2.text_input("Starts with", placeholder="e.g. Acme, New York, $")
+    if entity_label != "—":
+        matching = entity_extractor.documents_with_entity(
+            st.session_state.user["id"], entity_label, entity_query
+        )
+        docs = [row for row in docs if row["id"] in matching]
+    doc_entities = entity_extractor.entities_for_documents([row["id"] for row in docs])
+
     if not docs:
-        st.info("No documents uploaded yet.")
+        st.info("No documents uploaded yet." if entity_label == "—" else "No documents match this filter.")
     else:
         for row in docs:
             with st.container():
                 st.markdown(
                     f"<div class='card'><b>#{row['id']}</b> — {row['filename'] or 'Untitled'} "
-                    f"<br><span style='font-size:12px;opacity:0.7'>{row['created_at']}</span>"
+                    f"<br><span style='font-size:12px;opacity:0.7'>{row['created_at']}"
+                    + (f" · Flesch {row['flesch']} · grade {row['grade_level']}" if row["flesch"] is not None else "")
+                    + "</span>"
                     f"<br><br>{(row['content'][:280] + ('...' if len(row['content'])>280 else ''))}</div>",
                     unsafe_allow_html=True,
                 )
+                ents = doc_entities.get(row["id"])
+                if ents:
+                    st.caption(" · ".join(f"**{label}**: {', '.join(texts[:3])}" for label, texts in ents.items()))
+                with st.expander("Summary"):
+                    if row["summary_abstractive"]:
+                        st.write(row["summary_abstractive"])
+                        st.caption(f"Model: {row['summary_model']}")
+                    elif row["summary_hybrid"]:
+                        st.write(row["summary_hybrid"])
+                        st.caption("Abstractive summary pending…")
+                    else:
+                        st.caption("Summary pending…")
                 cols = st.columns([0.15, 0.15, 0.7])
                 if cols[0].button("View", key=f"view_{row['id']}"):
                     st.text_area(
@@ -205,4 +246,31 @@ with tab_docs:
                     delete_document(row["id"], st.session_state.user["id"])
                     st.success(f"Deleted document #{row['id']}")
                     st.experimental_rerun()
-                    
\ No newline at end of file
+
+with tab_search:
+    st.markdown("### Find Similar Clauses")
+    st.write("Paste a clause to find clauses with a similar meaning across your saved documents.")
+    clause_query = st.text_area("Clause", height=120, placeholder="e.g. The Supplier shall indemnify the Customer against...")
+    scol1, scol2 = st.columns([0.3, 0.7])
+    top_k = scol1.number_input("Results", min_value=1, max_value=50, value=10)
+    if scol2.button("Search", type="primary"):
+        if not clause_query.strip():
+            st.error("Paste a clause to search for first.")
+        else:
+            # Imported lazily: loads the embedding model on first use.
+            import clause_search
+            index = clause_search.get_index()
+            user_id = st.session_state.user["id"]
+            # Only this user's not-yet-indexed documents; a no-op query once they are in.
+            with st.spinner("Indexing new documents..."):
+                index.index_new_documents(user_id=user_id)
+            results = index.search(clause_query, k=int(top_k), user_id=user_id)
+            if not results:
+                st.info("No similar clauses found.")
+            for hit in results:
+                st.markdown(
+                    f"<div class='card'><b>#{hit['document_id']}</b> — {hit['filename'] or 'Untitled'} "
+                    f"<span style='font-size:12px;opacity:0.7'>(similarity {hit['score']:.2f})</span>"
+                    f"<br><br>{hit['clause']}</div>",
+                    unsafe_allow_html=True,
+                )
@@ -0,0 +1,46 @@
+# pages/Readability_Dashboard.py
+# -------------------------------------------------------------
+# Readability Dashboard - library-wide complexity metrics.
+# Everything here is aggregated in SQL over the columns filled in
+# at save time (see readability.py); no text is re-scored.
+# -------------------------------------------------------------
+
+import streamlit as st
+
+import auth_service
+import readability
+
+user_id = auth_service.require_login()["id"]
+conn = readability.get_conn()
+readability.init_readability_tables(conn)
+
+st.title("📊 Readability Dashboard")
+
+summary = readability.library_summary(conn, user_id)
+if not summary["documents"]:
+    st.info("No documents uploaded yet.")
+    st.stop()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Documents", summary["documents"])
+c2.metric("Avg. Flesch reading ease", summary["avg_flesch"])
+c3.metric("Avg. grade level", summary["avg_grade"])
+c4.metric("Legalese per 100 words", summary["avg_legalese_density"])
+st.caption(f"{summary['words'] or 0:,} words in total · average sentence length {summary['avg_sentence_length']} words")
+if summary["unscored"]:
+    st.warning(f"{summary['unscored']} document(s) have no metrics yet. Run `python readability.py` to backfill.")
+
+st.markdown("### Grade level distribution")
+st.bar_chart(readability.grade_histogram(conn, user_id), x="grade", y="documents")
+
+st.markdown("### Trend by upload month")
+trend = readability.monthly_trend(conn, user_id)
+st.line_chart(trend, x="month", y=["avg_flesch", "avg_grade"])
+
+st.markdown("### Hardest documents")
+st.dataframe(readability.hardest_documents(conn, user_id), hide_index=True)
+
+st.markdown("### Hardest clauses")
+st.dataframe(readability.hardest_clauses(conn, user_id), hide_index=True)
+
+conn.close()
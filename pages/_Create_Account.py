@@ -5,7 +5,7 @@
 
 import streamlit as st
 import backend # Import the new backend module
-import bcrypt # Needed for password hashing, used in app.py
+import auth_service
 
 # ---------------------------
 # UI
@@ -37,7 +37,11 @@ with st.form("register_form"):
             st.error("Passwords do not match.")
         else:
             # The add_user function from the backend now accepts email as the first argument
-            ok = backend.add_user(r_email, r_pwd, r_first_name, r_last_name)
+            try:
+                ok = backend.add_user(r_email, r_pwd, r_first_name, r_last_name)
+            except auth_service.AuthBusy as e:
+                st.error(str(e))
+                st.stop()
             if ok:
                 st.success("Registration successful. You can now log in.")
                 st.switch_page("pages/Auth.py")
@@ -5,7 +5,7 @@
 
 import streamlit as st
 import sqlite3
-import bcrypt
+import auth_service
 from datetime import datetime
 
 # ---------------------------
@@ -41,7 +41,7 @@ def init_db():
 def add_user(first_name: str, last_name: str, email: str, password: str) -> tuple[bool, str]:
     if not email or not password or not first_name or not last_name:
         return False, "All fields are required."
-    pw_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    pw_hash = auth_service.hash_password(password)
     try:
         conn = get_conn()
         conn.execute(
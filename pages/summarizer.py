@@ -1,12 +1,16 @@
 # pages/summarizer.py
 import streamlit as st
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from datetime import datetime
-from nltk.tokenize import sent_tokenize
-from sklearn.feature_extraction.text import TfidfVectorizer
-import numpy as np
 import os
 
+import blob_store
+import encoder_cache
+from doc_viewer import render_aligned_summary, render_document
+from inference_scheduler import get_scheduler
+from request_log import Stages, log_request
+from model_registry import DEFAULT_MODEL, selection_stats, startup_reports
+from summarization import abstractive_summarize, hybrid_summarize
+
 # ---------------------------
 # Page CSS styling
 # ---------------------------
@@ -22,103 +26,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# ---------------------------
-# Load abstractive model (BART)
-# ---------------------------
-@st.cache_resource
-def load_abstractive_model():
-    """
-    Load and cache the BART model for abstractive summarization.
-    Returns the tokenizer and model from Hugging Face's Transformers library."""
-    model_name = "facebook/bart-large-cnn"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-    model.eval()  # ensure model is in inference mode for efficiency
-    return tokenizer, model
-
-abst_tokenizer, abst_model = load_abstractive_model()
-
-# ---------------------------
-# Abstractive summarization (Purvesh's contribution)
-# ---------------------------
-def abstractive_summarize(text: str, max_length: int = 130, min_length: int = 30) -> str:
-    """
-    Generate a human-like abstractive summary using the BART model.
-    Follows a 4-step pipeline:
-        1. Preprocess input text
-        2. Pass text through pre-trained BART CNN model
-        3. Generate and decode summary
-        4. Postprocess for readability
-    """
-    
-    if not text.strip():
-        return " ⚠️ Please provide text to summarize."
-    
-    # Preprocessing
-    inputs = abst_tokenizer(
-        text,
-        return_tensors="pt", 
-        max_length=1024, 
-        truncation=True,
-        )
-
-    # Summary generation
-    summary_ids = abst_model.generate(
-        **inputs,
-        max_length=max_length,
-        min_length=min_length,
-        length_penalty=2.0,
-        num_beams=4,
-        early_stopping=True
-    )
-    return abst_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-
-# ---------------------------
-# Enhanced Hybrid Extractive Summarization
-# ---------------------------
-def hybrid_summarize(text: str, compression_ratio: float = 0.4) -> str:
-    sentences = sent_tokenize(text)
-    if len(sentences) <= 2:
-        return " ".join(sentences)
-
-    # 1. Calculate TF-IDF scores
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = vectorizer.fit_transform(sentences)
-    sentence_scores = tfidf_matrix.sum(axis=1).A1
-    
-    # Normalize scores to a 0-1 range
-    if sentence_scores.max() > 0:
-        sentence_scores = (sentence_scores - sentence_scores.min()) / (sentence_scores.max() - sentence_scores.min())
-    
-    # 2. Calculate position scores (higher for earlier sentences)
-    position_scores = np.array([1 / (i + 1) for i in range(len(sentences))])
-    # Normalize position scores
-    position_scores = (position_scores - position_scores.min()) / (position_scores.max() - position_scores.min())
-
-    # 3. Calculate length scores (closer to average length is better)
-    sentence_lengths = np.array([len(s.split()) for s in sentences])
-    avg_length = np.mean(sentence_lengths)
-    length_scores = np.exp(-np.abs(sentence_lengths - avg_length) / avg_length)
-
-    # 4. Combine scores with adjustable weights
-    alpha = 0.5  # Weight for TF-IDF
-    beta = 0.3   # Weight for Position
-    gamma = 0.2  # Weight for Length
-    
-    total_scores = (alpha * sentence_scores + beta * position_scores + gamma * length_scores)
-    
-    # Debugging: Print scores to see the ranking
-    # for i, (s, score) in enumerate(zip(sentences, total_scores)):
-    #     st.write(f"Sentence {i+1} (Score: {score:.4f}): {s}")
-    
-    # 5. Select top sentences
-    n = max(1, int(len(sentences) * compression_ratio))
-    top_idx = np.argsort(total_scores)[-n:]
-    top_idx_sorted = sorted(top_idx)
-    summary_sentences = [sentences[i] for i in top_idx_sorted]
-
-    return " ".join(summary_sentences)
-
 # ---------------------------
 # Streamlit UI
 # ---------------------------
@@ -144,12 +51,7 @@ if uploaded_file:
             doc = Document(uploaded_file)
             extracted_text = "\n".join([p.text for p in doc.paragraphs])
         elif ext == ".pdf":
-            from PyPDF2 import PdfReader
-            reader = PdfReader(uploaded_file)
-            pages = []
-            for p in reader.pages:
-                pages.append(p.extract_text() or "")
-            extracted_text = "\n".join(pages)
+            extracted_text = get_scheduler().extract_pdf(uploaded_file.getvalue())
     except Exception as e:
         st.error(f"Failed to read file: {e}")
 
@@ -161,20 +63,63 @@ compression_ratio = st.slider(
     "Hybrid compression ratio (only for Hybrid Extractive)", 0.1, 1.0, 0.4, 0.05
 )
 
+# Latency target for abstractive (0 = always use the best model for the input size)
+latency_target = st.slider(
+    "Abstractive latency target in seconds (0 = no limit)", 0.0, 30.0, 0.0, 0.5
+)
+
+# Summary length for abstractive (in tokens). Re-running the same text with
+# other lengths reuses the cached encoder pass (see encoder_cache.py).
+len_col1, len_col2 = st.columns(2)
+max_length = len_col1.slider("Maximum summary length (Abstractive)", 40, 400, 130, 10)
+min_length = len_col2.slider("Minimum summary length (Abstractive)", 10, 200, 30, 5)
+min_length = min(min_length, max_length)
+
 # Generate summary
 if st.button("Generate Summary"):
     if final_text:
+        stages = Stages()
+        params = {"method": method, "compression_ratio": compression_ratio,
+                  "latency_budget_ms": latency_target * 1000 or None,
+                  "max_length": max_length, "min_length": min_length}
         with st.spinner("Generating summary..."):
             if method == "Abstractive (BART)":
-                summary = abstractive_summarize(final_text)
+                model_stats = {}
+                summary = abstractive_summarize(
+                    final_text, max_length=max_length, min_length=min_length,
+                    latency_budget_ms=params["latency_budget_ms"], stats=model_stats
+                )
+                st.session_state.last_model = model_stats.get("model", DEFAULT_MODEL)
+                stages.ms.update({k: v for k, v in model_stats.items() if k.endswith("_ms")})
+                params["model"] = st.session_state.last_model
             else:
-                summary = hybrid_summarize(final_text, compression_ratio=compression_ratio)
-
-        st.markdown('<div class="subtitle">Original Text</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="card">{final_text}</div>', unsafe_allow_html=True)
-
-        st.markdown('<div class="subtitle">Summary</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="card">{summary}</div>', unsafe_allow_html=True)
+                with stages("hybrid"):
+                    summary = hybrid_summarize(final_text, compression_ratio=compression_ratio)
+        log_request("summarize", params, final_text, summary, stages)
+        # Kept across reruns so paging through the original doesn't lose the result.
+        blob_store.session_put("summary_result", {"source": final_text, "summary": summary, "method": method})
+        st.session_state.pop("sum_source_page", None)
+        st.session_state.pop("sum_source_focus", None)
     else:
         st.warning("Please provide text or upload a file to summarize.")
 
+result = blob_store.session_get("summary_result")
+if result:
+    st.markdown('<div class="subtitle">Original Text</div>', unsafe_allow_html=True)
+    render_document(result["source"], key="sum_source", box_class="card")
+
+    st.markdown('<div class="subtitle">Summary</div>', unsafe_allow_html=True)
+    render_aligned_summary(result["source"], result["summary"], source_key="sum_source")
+    if result["method"] == "Abstractive (BART)":
+        st.caption(f"Model: {st.session_state.get('last_model', DEFAULT_MODEL)}")
+
+with st.sidebar.expander("Model selection stats"):
+    st.json(selection_stats())
+    st.json(startup_reports)
+    st.json(get_scheduler().report())
+
+with st.sidebar.expander("Encoder cache"):
+    st.json(encoder_cache.report())
+
+with st.sidebar.expander("Session memory"):
+    st.json(blob_store.memory_report())
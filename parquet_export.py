@@ -0,0 +1,390 @@
+# parquet_export.py
+# -------------------------------------------------------------
+# Streaming export of the library to partitioned Parquet
+# (user=<id>/month=<YYYY-MM>/part-*.parquet) and bulk import back.
+# Documents are exported again whenever their summary or readability
+# columns change, so readers keep the row with the highest change_seq.
+# Request timings from the request log are exported as request_timings.
+#
+#   python parquet_export.py export --out export/
+#   python parquet_export.py export --out export/ --incremental
+#   python parquet_export.py import export/
+# -------------------------------------------------------------
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import entity_extractor
+import precompute
+import readability
+import request_log
+
+DB_PATH = "users.db"
+CHUNK_ROWS = 10_000
+# Each open writer buffers at most one chunk; older partitions are closed first.
+MAX_OPEN_WRITERS = 32
+WATERMARK_FILE = "_watermark.json"
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """
+    How one table is exported. `query` must select every column in `schema`
+    plus user_id and month (used for partitioning, the month only goes into
+    the directory name), order by `watermark` and take its last exported
+    value as the only parameter. `columns` are the ones written back on
+    import; rows that already exist (same `key`) are updated.
+    """
+    name: str
+    query: str
+    schema: pa.Schema
+    columns: tuple[str, ...]
+    watermark: str = "id"
+    key: tuple[str, ...] = ("id",)
+
+
+EXPORT_TABLES = [
+    TableSpec(
+        "documents",
+        "SELECT id, user_id, filename, mime, content, created_at, "
+        "summary_hybrid, summary_abstractive, summary_model, precomputed_at, "
+        "word_count, sentence_count, flesch, grade_level, avg_sentence_length, legalese_density, "
+        "change_seq, substr(created_at, 1, 7) AS month "
+        "FROM documents WHERE change_seq > ? ORDER BY change_seq",
+        pa.schema([
+            ("id", pa.int64()), ("user_id", pa.int64()), ("filename", pa.string()),
+            ("mime", pa.string()), ("content", pa.large_string()), ("created_at", pa.string()),
+            ("summary_hybrid", pa.large_string()), ("summary_abstractive", pa.large_string()),
+            ("summary_model", pa.string()), ("precomputed_at", pa.string()),
+            ("word_count", pa.int64()), ("sentence_count", pa.int64()), ("flesch", pa.float64()),
+            ("grade_level", pa.float64()), ("avg_sentence_length", pa.float64()),
+            ("legalese_density", pa.float64()), ("change_seq", pa.int64()),
+        ]),
+        ("id", "user_id", "filename", "mime", "content", "created_at",
+         "summary_hybrid", "summary_abstractive", "summary_model", "precomputed_at",
+         "word_count", "sentence_count", "flesch", "grade_level", "avg_sentence_length", "legalese_density"),
+        watermark="change_seq",
+    ),
+    TableSpec(
+        "document_entities",
+        "SELECT e.id, e.document_id, e.label, e.text, e.norm_text, e.start_char, e.end_char, "
+        "d.user_id, substr(d.created_at, 1, 7) AS month "
+        "FROM document_entities e JOIN documents d ON d.id = e.document_id WHERE e.id > ? ORDER BY e.id",
+        pa.schema([
+            ("id", pa.int64()), ("document_id", pa.int64()), ("label", pa.string()),
+            ("text", pa.string()), ("norm_text", pa.string()), ("start_char", pa.int64()),
+            ("end_char", pa.int64()), ("user_id", pa.int64()),
+        ]),
+        ("id", "document_id", "label", "text", "norm_text", "start_char", "end_char"),
+    ),
+    TableSpec(
+        "clause_readability",
+        # No id column of its own: the rowid serves as the export watermark.
+        "SELECT c.rowid AS id, c.document_id, c.clause_no, c.start_char, c.end_char, c.word_count, "
+        "c.sentence_count, c.flesch, c.grade_level, c.avg_sentence_length, c.legalese_density, "
+        "d.user_id, substr(d.created_at, 1, 7) AS month "
+        "FROM clause_readability c JOIN documents d ON d.id = c.document_id WHERE c.rowid > ? ORDER BY c.rowid",
+        pa.schema([
+            ("id", pa.int64()), ("document_id", pa.int64()), ("clause_no", pa.int64()),
+            ("start_char", pa.int64()), ("end_char", pa.int64()), ("word_count", pa.int64()),
+            ("sentence_count", pa.int64()), ("flesch", pa.float64()), ("grade_level", pa.float64()),
+            ("avg_sentence_length", pa.float64()), ("legalese_density", pa.float64()), ("user_id", pa.int64()),
+        ]),
+        ("document_id", "clause_no", "start_char", "end_char", "word_count", "sentence_count",
+         "flesch", "grade_level", "avg_sentence_length", "legalese_density"),
+        key=("document_id", "clause_no"),
+    ),
+]
+
+# Request log entries (see request_log.py); export only, nothing is imported.
+TIMINGS_SCHEMA = pa.schema([
+    ("ts", pa.float64()), ("method", pa.string()), ("input_bytes", pa.int64()),
+    ("output_chars", pa.int64()), ("total_ms", pa.float64()),
+    ("stages_ms", pa.map_(pa.string(), pa.float64())),
+])
+
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def _init_tables(conn):
+    """Add the columns and tables the app creates on startup, so old databases export and import too."""
+    if _table_exists(conn, "documents"):
+        entity_extractor.init_entity_tables(conn)
+        precompute.init_tables(conn)
+        readability.init_readability_tables(conn)
+        _init_change_tracking(conn)
+
+
+def _init_change_tracking(conn):
+    """
+    documents.change_seq: bumped by triggers on insert and whenever a summary
+    or readability column is written, by any process. SQLite serialises
+    writers, so it only ever grows in commit order and works as a watermark.
+    Rows that predate tracking start at their id, which keeps id watermarks
+    from older exports valid.
+    """
+    if "change_seq" not in {r["name"] for r in conn.execute("PRAGMA table_info(documents)")}:
+        conn.execute("ALTER TABLE documents ADD COLUMN change_seq INTEGER")
+    conn.execute("UPDATE documents SET change_seq = id WHERE change_seq IS NULL")
+    mutable = ", ".join([*precompute.DOCUMENT_COLUMNS, *readability.DOCUMENT_COLUMNS])
+    bump = ("UPDATE documents SET change_seq = (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM documents) "
+            "WHERE id = NEW.id;")
+    # Recreated every time so the column list follows DOCUMENT_COLUMNS.
+    conn.executescript(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_documents_change_seq ON documents(change_seq);
+        DROP TRIGGER IF EXISTS documents_change_insert;
+        CREATE TRIGGER documents_change_insert AFTER INSERT ON documents BEGIN {bump} END;
+        DROP TRIGGER IF EXISTS documents_change_update;
+        CREATE TRIGGER documents_change_update AFTER UPDATE OF {mutable} ON documents BEGIN {bump} END;
+        """
+    )
+
+
+def _read_watermark(out_dir: str) -> dict:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_watermark(out_dir: str, watermark: dict):
+    tmp = os.path.join(out_dir, WATERMARK_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, WATERMARK_FILE))
+
+
+# ---------------------------
+# Export
+# ---------------------------
+class _PartitionWriters:
+    """Keeps a bounded number of ParquetWriters open, one per (user, month)."""
+
+    def __init__(self, root: str, schema: pa.Schema, run_id: str):
+        self.root = root
+        self.schema = schema
+        self.run_id = run_id
+        self.open: OrderedDict = OrderedDict()
+        self.parts = 0
+        self.files: list[str] = []
+
+    def write(self, user_id, month, table: pa.Table):
+        key = (user_id, month)
+        writer = self.open.pop(key, None)
+        if writer is None:
+            if len(self.open) >= MAX_OPEN_WRITERS:
+                _, oldest = self.open.popitem(last=False)
+                oldest.close()
+            part_dir = os.path.join(self.root, f"user={user_id}", f"month={month or 'unknown'}")
+            os.makedirs(part_dir, exist_ok=True)
+            path = os.path.join(part_dir, f"part-{self.run_id}-{self.parts:05d}.parquet")
+            self.parts += 1
+            self.files.append(path)
+            writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        writer.write_table(table)
+        self.open[key] = writer
+
+    def close(self):
+        for writer in self.open.values():
+            writer.close()
+        self.open.clear()
+
+
+def _export_chunks(root: str, schema: pa.Schema, chunks) -> int:
+    """
+    Write chunks of rows (anything indexable by column name, including
+    user_id and month) to partitioned Parquet under root. Returns rows written.
+    """
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:6]
+    writers = _PartitionWriters(root, schema, run_id)
+    names = schema.names
+    rows_written = 0
+    try:
+        for rows in chunks:
+            # Group the chunk by partition, then build one Arrow table per group.
+            groups: dict[tuple, list] = {}
+            for row in rows:
+                groups.setdefault((row["user_id"], row["month"]), []).append(row)
+            for (user_id, month), group in groups.items():
+                columns = {n: [r[n] for r in group] for n in names}
+                writers.write(user_id, month, pa.Table.from_pydict(columns, schema=schema))
+            rows_written += len(rows)
+    except BaseException:
+        writers.close()
+        # Leave no partial files from this run behind.
+        for path in writers.files:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    writers.close()
+    return rows_written
+
+
+def export_table(conn, spec: TableSpec, out_dir: str, since: int = 0,
+                 chunk_rows: int = CHUNK_ROWS) -> tuple[int, int]:
+    """
+    Stream one table into partitioned Parquet. Only `chunk_rows` rows are
+    held in memory at a time. Returns (rows written, last watermark value).
+    """
+    last = since
+
+    def chunks():
+        nonlocal last
+        cur = conn.execute(spec.query, (since,))
+        while rows := cur.fetchmany(chunk_rows):
+            yield rows
+            last = rows[-1][spec.watermark]
+
+    rows_written = _export_chunks(os.path.join(out_dir, spec.name), spec.schema, chunks())
+    return rows_written, last
+
+
+def export_timings(out_dir: str, log_path: str = request_log.LOG_PATH, since_ts: float = 0.0,
+                   chunk_rows: int = CHUNK_ROWS) -> tuple[int, float]:
+    """
+    Stream request log entries newer than since_ts into request_timings/.
+    Entries carry no user, so they are partitioned as user=all.
+    Returns (rows written, last ts).
+    """
+    last = since_ts
+
+    def chunks():
+        nonlocal last
+        rows = []
+        for entry in request_log.iter_log(log_path):
+            if entry["ts"] <= since_ts:
+                continue
+            rows.append({
+                "ts": entry["ts"], "method": entry.get("method"),
+                "input_bytes": entry.get("input_bytes"), "output_chars": entry.get("output_chars"),
+                "total_ms": entry.get("total_ms"), "stages_ms": list((entry.get("stages_ms") or {}).items()),
+                "user_id": "all", "month": time.strftime("%Y-%m", time.gmtime(entry["ts"])),
+            })
+            last = max(last, entry["ts"])
+            if len(rows) >= chunk_rows:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+    rows_written = _export_chunks(os.path.join(out_dir, "request_timings"), TIMINGS_SCHEMA, chunks())
+    return rows_written, last
+
+
+def export_all(out_dir: str, incremental: bool = False, db_path: str = DB_PATH,
+               chunk_rows: int = CHUNK_ROWS, log_path: str = request_log.LOG_PATH) -> dict:
+    """
+    Export every known table and the request timings; with incremental=True
+    only what was added or changed since the stored watermark.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if not incremental and os.path.exists(os.path.join(out_dir, WATERMARK_FILE)):
+        raise FileExistsError(f"{out_dir} already holds an export; use --incremental or a new directory")
+    watermark = _read_watermark(out_dir) if incremental else {}
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    _init_tables(conn)
+    report = {}
+    for spec in EXPORT_TABLES:
+        if not _table_exists(conn, spec.name):
+            continue
+        rows, last = export_table(conn, spec, out_dir, watermark.get(spec.name, 0), chunk_rows)
+        watermark[spec.name] = last
+        report[spec.name] = rows
+        # Saved per table so an interrupted run resumes where it stopped.
+        _write_watermark(out_dir, watermark)
+    conn.close()
+    rows, last = export_timings(out_dir, log_path, watermark.get("request_timings", 0.0), chunk_rows)
+    watermark["request_timings"] = last
+    report["request_timings"] = rows
+    _write_watermark(out_dir, watermark)
+    return report
+
+
+# ---------------------------
+# Import
+# ---------------------------
+def import_all(in_dir: str, db_path: str = DB_PATH, batch_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Load an export back into a database. Rows keep their ids; existing rows
+    are updated, files are applied oldest export first so later versions of
+    a row win, and importing the same export twice is harmless.
+    Tables must already exist (run the app or the relevant module once).
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    _init_tables(conn)
+    report = {}
+    for spec in EXPORT_TABLES:
+        table_dir = os.path.join(in_dir, spec.name)
+        if not os.path.isdir(table_dir) or not _table_exists(conn, spec.name):
+            continue
+        # Part names start with the export's UTC timestamp, so sorting by name is export order.
+        paths = sorted(
+            (os.path.join(root, f) for root, _, files in os.walk(table_dir) for f in files if f.endswith(".parquet")),
+            key=os.path.basename,
+        )
+        if not paths:
+            continue
+        # Reading with the current schema fills columns missing from older exports with nulls.
+        dataset = ds.dataset(paths, schema=spec.schema, format="parquet")
+        updates = ", ".join(f"{c}=excluded.{c}" for c in spec.columns if c not in spec.key)
+        sql = (f"INSERT INTO {spec.name}({', '.join(spec.columns)}) "
+               f"VALUES({', '.join('?' * len(spec.columns))}) "
+               f"ON CONFLICT({', '.join(spec.key)}) DO UPDATE SET {updates}")
+        count = 0
+        for batch in dataset.to_batches(columns=list(spec.columns), batch_size=batch_rows):
+            columns = [batch.column(c).to_pylist() for c in spec.columns]
+            with conn:
+                conn.executemany(sql, zip(*columns))
+            count += batch.num_rows
+        report[spec.name] = count
+    if "document_entities" in report:
+        # Extraction stores a document's entities and its status row in one
+        # transaction, so documents with entities were fully processed. Without
+        # this, extract_all would run them again and duplicate their entities.
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO document_entity_status(document_id, model, processed_at) "
+                "SELECT DISTINCT document_id, ?, ? FROM document_entities",
+                (entity_extractor.SPACY_MODEL, datetime.utcnow().isoformat()),
+            )
+    conn.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the library to Parquet, or import an export.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export")
+    p_export.add_argument("--out", required=True)
+    p_export.add_argument("--incremental", action="store_true", help="Only rows added or changed since the last export")
+    p_export.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p_import = sub.add_parser("import")
+    p_import.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        report = export_all(args.out, args.incremental, chunk_rows=args.chunk_rows)
+    else:
+        report = import_all(args.path)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# precompute.py
+# -------------------------------------------------------------
+# Background precomputation of summaries for saved documents.
+# save_document schedules a job; a low-priority worker thread
+# fills in hybrid + abstractive summaries on the document row,
+# always yielding to interactive requests.
+#
+#   python precompute.py        # drain pending jobs and exit
+# -------------------------------------------------------------
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import model_registry
+
+DB_PATH = "users.db"
+# Poll interval when idle; a scheduled job wakes the worker immediately.
+IDLE_POLL_S = 5.0
+# How often the worker re-checks for interactive requests while waiting.
+YIELD_POLL_S = 0.2
+# Jobs claimed longer ago than this are assumed abandoned (crashed process).
+STALE_CLAIM = timedelta(hours=1)
+NICE_INCREMENT = 10
+
+DOCUMENT_COLUMNS = {
+    "summary_hybrid": "TEXT",
+    "summary_abstractive": "TEXT",
+    "summary_model": "TEXT",
+    "precomputed_at": "TEXT",
+}
+
+log = logging.getLogger("precompute")
+
+
+# ---------------------------
+# Database
+# ---------------------------
+def get_conn(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_tables(conn):
+    """Add the precomputed columns to documents and create the job table."""
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(documents)")}
+    for name, kind in DOCUMENT_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE documents ADD COLUMN {name} {kind}")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS summary_jobs(
+            document_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            enqueued_at TEXT NOT NULL
+        );
+        """
+    )
+    job_columns = {r["name"] for r in conn.execute("PRAGMA table_info(summary_jobs)")}
+    if "claimed_at" not in job_columns:
+        conn.execute("ALTER TABLE summary_jobs ADD COLUMN claimed_at TEXT")
+    if "error" not in job_columns:
+        conn.execute("ALTER TABLE summary_jobs ADD COLUMN error TEXT")
+    conn.commit()
+
+
+# ---------------------------
+# Work
+# ---------------------------
+class Preempted(Exception):
+    """An interactive request arrived while background generation was running."""
+
+
+class _YieldToInteractive:
+    """
+    transformers StoppingCriteria: stop generating as soon as an interactive
+    request is in flight. The partial output is discarded and the job retried.
+    Sets stats["preempted"] so the truncated run is not recorded as a latency sample.
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+        self.fired = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if model_registry.interactive_depth() > 0:
+            self.fired = self.stats["preempted"] = True
+        return self.fired
+
+
+def _wait_for_idle(stop: threading.Event):
+    while model_registry.interactive_depth() > 0 and not stop.is_set():
+        time.sleep(YIELD_POLL_S)
+
+
+def compute(text: str, stop: threading.Event) -> dict:
+    """All precomputed fields for one document; raises Preempted if it had to yield."""
+    from transformers import StoppingCriteriaList
+    from summarization import abstractive_summarize, hybrid_summarize
+
+    _wait_for_idle(stop)
+    result = {"summary_hybrid": hybrid_summarize(text)}
+
+    _wait_for_idle(stop)
+    stats = {}
+    criteria = _YieldToInteractive(stats)
+    summary = abstractive_summarize(
+        text, stats=stats, background=True, stopping_criteria=StoppingCriteriaList([criteria])
+    )
+    if criteria.fired:
+        raise Preempted()
+    result["summary_abstractive"] = summary
+    result["summary_model"] = stats.get("model")
+    return result
+
+
+class PrecomputeWorker:
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self.wake = threading.Event()
+        self.stop = threading.Event()
+        self.thread = None
+        self.processed = 0
+
+    def _claim(self, conn):
+        """Atomically take the oldest pending job. Returns its document id or None."""
+        stale = (datetime.utcnow() - STALE_CLAIM).isoformat()
+        with conn:
+            conn.execute(
+                "UPDATE summary_jobs SET status='pending' WHERE status='running' AND claimed_at < ?", (stale,)
+            )
+            row = conn.execute(
+                "SELECT document_id FROM summary_jobs WHERE status='pending' ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            cur = conn.execute(
+                "UPDATE summary_jobs SET status='running', claimed_at=? WHERE document_id=? AND status='pending'",
+                (datetime.utcnow().isoformat(), row["document_id"]),
+            )
+        return row["document_id"] if cur.rowcount else None
+
+    def run_once(self, conn) -> bool:
+        """Process one job. Returns False when there was nothing to do."""
+        doc_id = self._claim(conn)
+        if doc_id is None:
+            return False
+        row = conn.execute("SELECT content FROM documents WHERE id=?", (doc_id,)).fetchone()
+        if row is None:
+            with conn:
+                conn.execute("DELETE FROM summary_jobs WHERE document_id=?", (doc_id,))
+            return True
+        try:
+            result = compute(row["content"], self.stop)
+        except Preempted:
+            with conn:
+                conn.execute("UPDATE summary_jobs SET status='pending' WHERE document_id=?", (doc_id,))
+            return True
+        except Exception as e:
+            log.exception("Precompute failed for document %s", doc_id)
+            with conn:
+                conn.execute("UPDATE summary_jobs SET status='failed', error=? WHERE document_id=?", (str(e), doc_id))
+            return True
+        result["precomputed_at"] = datetime.utcnow().isoformat()
+        with conn:
+            conn.execute(
+                f"UPDATE documents SET {', '.join(f'{k}=?' for k in result)} WHERE id=?",
+                (*result.values(), doc_id),
+            )
+            conn.execute("DELETE FROM summary_jobs WHERE document_id=?", (doc_id,))
+        self.processed += 1
+        return True
+
+    def _run(self):
+        # Lower this thread's CPU priority (Linux applies nice per thread).
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), NICE_INCREMENT)
+        except (AttributeError, OSError):
+            pass
+        conn = get_conn(self.db_path)
+        init_tables(conn)
+        while not self.stop.is_set():
+            if not self.run_once(conn):
+                self.wake.wait(IDLE_POLL_S)
+                self.wake.clear()
+        conn.close()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="precompute", daemon=True)
+            self.thread.start()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def ensure_worker(db_path: str = DB_PATH) -> PrecomputeWorker:
+    """Start the per-process background worker if it isn't running yet."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PrecomputeWorker(db_path)
+        _worker.start()
+        return _worker
+
+
+def schedule(conn, doc_id: int):
+    """Post-save hook: queue a document for precomputation and wake the worker."""
+    conn.execute(
+        "INSERT OR REPLACE INTO summary_jobs(document_id, status, enqueued_at) VALUES(?, 'pending', ?)",
+        (doc_id, datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+    if _worker is not None:
+        _worker.wake.set()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    worker = PrecomputeWorker()
+    conn = get_conn()
+    init_tables(conn)
+    while worker.run_once(conn):
+        pass
+    conn.close()
+    print(f"Precomputed {worker.processed} document(s).")
+
+
+if __name__ == "__main__":
+    main()
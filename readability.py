@@ -0,0 +1,281 @@
+# readability.py
+# -------------------------------------------------------------
+# Readability and complexity metrics (textstat syllables) per
+# document and per clause, stored in columns at save time.
+# Scoring works on a whole pandas Series at once, so the bulk
+# backfill and single saves share one vectorized code path.
+#
+#   python readability.py              # score documents missing metrics
+#   python readability.py --all        # rescore the whole library
+# -------------------------------------------------------------
+
+import argparse
+import re
+import sqlite3
+from functools import lru_cache
+
+import pandas as pd
+
+from clause_search import split_clauses
+
+DB_PATH = "users.db"
+BACKFILL_CHUNK = 2000
+
+METRICS = ["word_count", "sentence_count", "flesch", "grade_level", "avg_sentence_length", "legalese_density"]
+DOCUMENT_COLUMNS = {
+    "word_count": "INTEGER",
+    "sentence_count": "INTEGER",
+    "flesch": "REAL",
+    "grade_level": "REAL",
+    "avg_sentence_length": "REAL",
+    "legalese_density": "REAL",
+}
+
+# Archaic or formulaic legal vocabulary; density is hits per 100 words.
+LEGALESE_TERMS = [
+    "herein", "hereinafter", "hereby", "hereof", "hereto", "hereunder", "heretofore",
+    "therein", "thereof", "thereto", "thereunder", "thereafter", "whereas", "whereby",
+    "wherein", "whereof", "notwithstanding", "pursuant", "aforementioned", "aforesaid",
+    "forthwith", "inter alia", "mutatis mutandis", "represents and warrants",
+    "in witness whereof", "null and void", "time is of the essence",
+]
+# Single words are matched against the exploded word Series; only phrases need a regex.
+_LEGALESE_WORDS = [t for t in LEGALESE_TERMS if " " not in t]
+_LEGALESE_PHRASES = r"(?i)\b(?:" + "|".join(
+    re.escape(t).replace(r"\ ", r"\s+") for t in LEGALESE_TERMS if " " in t
+) + r")\b"
+_WORD = r"[A-Za-z]+(?:'[A-Za-z]+)?"
+_SENTENCE_END = r"[.!?]+(?=\s|$)"
+
+
+# ---------------------------
+# Database
+# ---------------------------
+def get_conn():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_readability_tables(conn):
+    """Add metric columns to documents and create the per-clause table."""
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(documents)")}
+    for name, kind in DOCUMENT_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE documents ADD COLUMN {name} {kind}")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS clause_readability(
+            document_id INTEGER NOT NULL,
+            clause_no INTEGER NOT NULL,
+            start_char INTEGER NOT NULL,
+            end_char INTEGER NOT NULL,
+            word_count INTEGER,
+            sentence_count INTEGER,
+            flesch REAL,
+            grade_level REAL,
+            avg_sentence_length REAL,
+            legalese_density REAL,
+            PRIMARY KEY(document_id, clause_no),
+            FOREIGN KEY(document_id) REFERENCES documents(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_documents_user ON documents(user_id);
+        CREATE INDEX IF NOT EXISTS idx_clause_readability_grade ON clause_readability(grade_level);
+        """
+    )
+    conn.commit()
+
+
+def delete_readability(conn, doc_id: int):
+    conn.execute("DELETE FROM clause_readability WHERE document_id=?", (doc_id,))
+
+
+# ---------------------------
+# Scoring
+# ---------------------------
+@lru_cache(maxsize=200_000)
+def _syllables(word: str) -> int:
+    import textstat
+    return max(1, textstat.syllable_count(word))
+
+
+def score(texts: pd.Series) -> pd.DataFrame:
+    """
+    Metrics for every text in the Series, indexed like it. Words are
+    exploded into one long Series so syllables are looked up once per
+    distinct word, then summed back per text with a groupby.
+    """
+    words = texts.str.findall(_WORD)
+    flat = words.explode().dropna().str.lower()
+    levels = list(range(texts.index.nlevels))
+    syllables = flat.map(pd.Series({w: _syllables(w) for w in flat.unique()}, dtype="int64"))
+    syllables = syllables.groupby(level=levels).sum().reindex(texts.index, fill_value=0)
+    legalese = flat.isin(_LEGALESE_WORDS).groupby(level=levels).sum().reindex(texts.index, fill_value=0)
+    legalese += texts.str.count(_LEGALESE_PHRASES)
+
+    n_words = words.str.len()
+    n_sentences = texts.str.count(_SENTENCE_END).clip(lower=1)
+    # Texts with no words get NaN metrics instead of a formula on zeros.
+    safe_words = n_words.where(n_words > 0)
+    words_per_sentence = safe_words / n_sentences
+    syllables_per_word = syllables / safe_words
+
+    return pd.DataFrame({
+        "word_count": n_words,
+        "sentence_count": n_sentences,
+        "flesch": (206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word).round(1),
+        "grade_level": (0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59).round(1),
+        "avg_sentence_length": words_per_sentence.round(1),
+        "legalese_density": (100 * legalese / safe_words).round(2),
+    }, index=texts.index)
+
+
+def metrics(text: str) -> dict:
+    """Metrics for a single text (e.g. unsaved input on a page)."""
+    return dict(zip(METRICS, _rows(score(pd.Series([text], dtype="object")), METRICS)[0]))
+
+
+def _clause_frame(docs: pd.Series) -> pd.DataFrame:
+    """One row per clause, indexed by (document_id, clause_no)."""
+    rows = [
+        (doc_id, i, s, e, text[s:e])
+        for doc_id, text in docs.items()
+        for i, (s, e) in enumerate(split_clauses(text))
+    ]
+    frame = pd.DataFrame(rows, columns=["document_id", "clause_no", "start_char", "end_char", "text"])
+    return frame.set_index(["document_id", "clause_no"])
+
+
+def _rows(frame: pd.DataFrame, columns: list[str]):
+    """DataFrame rows as plain Python tuples (NaN -> NULL) for executemany."""
+    frame = frame[columns].astype(object).where(frame[columns].notna(), None)
+    return [tuple(v.item() if hasattr(v, "item") else v for v in row) for row in frame.itertuples(index=False)]
+
+
+def store_many(conn, docs: pd.Series):
+    """
+    Score documents (Series of content indexed by document id) and their
+    clauses, and write the results. The caller commits.
+    """
+    if docs.empty:
+        return
+    doc_scores = score(docs)
+    doc_scores["id"] = doc_scores.index
+    conn.executemany(
+        f"UPDATE documents SET {', '.join(f'{m}=?' for m in METRICS)} WHERE id=?",
+        _rows(doc_scores, METRICS + ["id"]),
+    )
+
+    clauses = _clause_frame(docs)
+    conn.executemany(
+        "DELETE FROM clause_readability WHERE document_id=?", [(int(i),) for i in docs.index]
+    )
+    if clauses.empty:
+        return
+    clauses = clauses.join(score(clauses["text"])).reset_index()
+    columns = ["document_id", "clause_no", "start_char", "end_char"] + METRICS
+    conn.executemany(
+        f"INSERT INTO clause_readability({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})",
+        _rows(clauses, columns),
+    )
+
+
+def store(conn, doc_id: int, content: str):
+    """Save-time hook for a single document."""
+    store_many(conn, pd.Series({doc_id: content}, dtype="object"))
+
+
+def backfill(include_all: bool = False, chunk: int = BACKFILL_CHUNK) -> int:
+    """Score the existing library in chunks of `chunk` documents."""
+    conn = get_conn()
+    init_readability_tables(conn)
+    where = "" if include_all else " WHERE word_count IS NULL"
+    ids = [r[0] for r in conn.execute(f"SELECT id FROM documents{where} ORDER BY id")]
+    for i in range(0, len(ids), chunk):
+        part = ids[i:i + chunk]
+        rows = conn.execute(
+            f"SELECT id, content FROM documents WHERE id IN ({', '.join('?' * len(part))})", part
+        ).fetchall()
+        with conn:
+            store_many(conn, pd.Series({r["id"]: r["content"] for r in rows}, dtype="object"))
+    conn.close()
+    return len(ids)
+
+
+# ---------------------------
+# Dashboard queries
+# ---------------------------
+def library_summary(conn, user_id: int) -> dict:
+    row = conn.execute(
+        """
+        SELECT COUNT(*) AS documents, SUM(word_count) AS words,
+               ROUND(AVG(flesch), 1) AS avg_flesch, ROUND(AVG(grade_level), 1) AS avg_grade,
+               ROUND(AVG(avg_sentence_length), 1) AS avg_sentence_length,
+               ROUND(AVG(legalese_density), 2) AS avg_legalese_density,
+               SUM(word_count IS NULL) AS unscored
+        FROM documents WHERE user_id=?
+        """,
+        (user_id,),
+    ).fetchone()
+    return dict(row)
+
+
+def grade_histogram(conn, user_id: int) -> pd.DataFrame:
+    return pd.read_sql_query(
+        """
+        SELECT MIN(MAX(CAST(grade_level AS INTEGER), 0), 20) AS grade, COUNT(*) AS documents
+        FROM documents WHERE user_id=? AND grade_level IS NOT NULL
+        GROUP BY grade ORDER BY grade
+        """,
+        conn, params=(user_id,),
+    )
+
+
+def monthly_trend(conn, user_id: int) -> pd.DataFrame:
+    return pd.read_sql_query(
+        """
+        SELECT substr(created_at, 1, 7) AS month, COUNT(*) AS documents,
+               ROUND(AVG(flesch), 1) AS avg_flesch, ROUND(AVG(grade_level), 1) AS avg_grade,
+               ROUND(AVG(legalese_density), 2) AS avg_legalese_density
+        FROM documents WHERE user_id=? AND flesch IS NOT NULL
+        GROUP BY month ORDER BY month
+        """,
+        conn, params=(user_id,),
+    )
+
+
+def hardest_documents(conn, user_id: int, limit: int = 10) -> pd.DataFrame:
+    return pd.read_sql_query(
+        """
+        SELECT id, filename, word_count, flesch, grade_level, avg_sentence_length, legalese_density
+        FROM documents WHERE user_id=? AND grade_level IS NOT NULL
+        ORDER BY grade_level DESC LIMIT ?
+        """,
+        conn, params=(user_id, limit),
+    )
+
+
+def hardest_clauses(conn, user_id: int, limit: int = 10) -> pd.DataFrame:
+    return pd.read_sql_query(
+        """
+        SELECT c.document_id, d.filename, c.clause_no, c.word_count, c.flesch, c.grade_level,
+               c.legalese_density, substr(d.content, c.start_char + 1, MIN(c.end_char - c.start_char, 300)) AS excerpt
+        FROM clause_readability c JOIN documents d ON d.id = c.document_id
+        WHERE d.user_id=? AND c.word_count >= 5
+        ORDER BY c.grade_level DESC LIMIT ?
+        """,
+        conn, params=(user_id, limit),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute readability metrics for stored documents.")
+    parser.add_argument("--all", action="store_true", help="Rescore every document, not just unscored ones")
+    parser.add_argument("--chunk", type=int, default=BACKFILL_CHUNK)
+    args = parser.parse_args(argv)
+    n = backfill(args.all, args.chunk)
+    print(f"Scored {n} document(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# request_log.py
+# -------------------------------------------------------------
+# Append-only JSONL log of summarize / simplify / save requests,
+# written by a background thread, plus a replay tool.
+#
+#   python request_log.py replay logs/requests.jsonl              # original pacing
+#   python request_log.py replay logs/requests.jsonl --speed 10   # 10x faster
+#   python request_log.py replay logs/requests.jsonl --speed 0 --concurrency 4
+#
+# Replay needs the inputs, which are only kept with CLAUSEEASE_LOG_INPUTS=1.
+# -------------------------------------------------------------
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Not the repo-root requests.jsonl: that file is a checked-out work queue, not a log.
+LOG_PATH = os.environ.get("CLAUSEEASE_REQUEST_LOG", os.path.join("logs", "requests.jsonl"))
+MAX_BYTES = 50 * 1024 * 1024
+BACKUPS = 5
+FLUSH_EVERY_S = 1.0
+QUEUE_SIZE = 10_000
+# Opt-in: keep a copy of each request's input text so the log can be replayed.
+# Inputs are contract text, so they live in their own directory (not the
+# session blob store) and are deleted after CAPTURE_RETENTION_DAYS.
+CAPTURE_INPUTS = os.environ.get("CLAUSEEASE_LOG_INPUTS", "0") == "1"
+CAPTURE_DIR = os.environ.get("CLAUSEEASE_LOG_INPUT_DIR", os.path.join("logs", "inputs"))
+CAPTURE_RETENTION_DAYS = float(os.environ.get("CLAUSEEASE_LOG_INPUT_DAYS", "7"))
+
+log = logging.getLogger("request_log")
+
+
+class Stages:
+    """Collects per-stage timings: `with stages("generate"): ...`."""
+
+    def __init__(self):
+        self.ms: dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def __call__(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ms[name] = round(self.ms.get(name, 0.0) + (time.perf_counter() - start) * 1000, 1)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+
+# ---------------------------
+# Captured inputs
+# ---------------------------
+def _input_path(digest: str) -> str:
+    return os.path.join(CAPTURE_DIR, digest[:2], digest)
+
+
+def capture_input(digest: str, data: bytes):
+    path = _input_path(digest)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_input(digest: str) -> str:
+    with open(_input_path(digest), "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def prune_inputs(max_age_s: float = CAPTURE_RETENTION_DAYS * 86400) -> int:
+    """Delete captured inputs older than max_age_s. Returns how many were removed."""
+    removed, cutoff = 0, time.time() - max_age_s
+    for root, _, files in os.walk(CAPTURE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+# ---------------------------
+# Writer
+# ---------------------------
+class RequestLog:
+    """
+    record() only enqueues; a daemon thread batches records into the file
+    and rotates it at MAX_BYTES. When the queue is full records are dropped
+    (and counted) rather than slowing the request down. A record that fails
+    to write is logged and counted; the writer thread keeps going.
+    """
+
+    def __init__(self, path: str = LOG_PATH, max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._file = None
+        self._size = 0   # bytes in the current file; tell() would flush the buffer
+        self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, entry: dict):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Large userspace buffer: lines are only written out when it fills or on flush.
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1 << 16)
+        self._size = os.path.getsize(self.path)
+
+    def _rotate(self):
+        self._file.close()
+        if CAPTURE_INPUTS:
+            prune_inputs()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def _write(self, entry: dict):
+        # Hashing and input capture happen here, off the request thread.
+        try:
+            data = entry.pop("_text").encode("utf-8")
+            entry["input_sha256"] = hashlib.sha256(data).hexdigest()
+            entry["input_bytes"] = len(data)
+            if CAPTURE_INPUTS:
+                capture_input(entry["input_sha256"], data)
+            line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+            self._file.write(line)
+            self._size += len(line)   # ASCII-only (json.dumps escapes the rest), so chars == bytes
+            self.written += 1
+        except Exception:
+            self.failed += 1
+            log.exception("Could not write request log entry for %s", entry.get("method"))
+
+    def _run(self):
+        self._open()
+        if CAPTURE_INPUTS:
+            try:
+                prune_inputs()
+            except OSError:
+                log.exception("Could not prune %s", CAPTURE_DIR)
+        while True:
+            try:
+                entry = self.queue.get(timeout=FLUSH_EVERY_S)
+            except queue.Empty:
+                self._file.flush()
+                continue
+            # Drain whatever else is queued before checking the file size again.
+            while entry is not None:
+                self._write(entry)
+                try:
+                    entry = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if entry is None:
+                break
+            if self._size >= self.max_bytes:
+                try:
+                    self._rotate()
+                except OSError:
+                    log.exception("Could not rotate %s", self.path)
+                    if self._file.closed:
+                        self._open()
+        self._file.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log() -> RequestLog:
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = RequestLog()
+        return _log
+
+
+def log_request(method: str, params: dict, text: str, output: str | None = None,
+                stages: Stages | None = None, **extra):
+    """
+    Record one request: method, parameters, input hash and size, output size
+    and stage timings. Only enqueues; never blocks on disk.
+    """
+    entry = {
+        "ts": time.time(),
+        "method": method,
+        "params": params,
+        "_text": text,
+        "output_chars": len(output) if output is not None else None,
+        "stages_ms": stages.ms if stages else {},
+        "total_ms": stages.total_ms() if stages else None,
+        **extra,
+    }
+    get_log().record(entry)
+
+
+# ---------------------------
+# Replay
+# ---------------------------
+def _handler(method: str):
+    """The current implementation of a logged method."""
+    if method == "summarize":
+        from summarization import abstractive_summarize, hybrid_summarize
+
+        def run(text, params):
+            if params.get("method") == "Hybrid Extractive":
+                return hybrid_summarize(text, compression_ratio=params.get("compression_ratio", 0.4))
+            return abstractive_summarize(text, max_length=params.get("max_length", 130),
+                                         min_length=params.get("min_length", 30),
+                                         latency_budget_ms=params.get("latency_budget_ms"))
+        return run
+    if method == "simplify":
+        from utils.simplifier import simplify_text
+        return lambda text, params: simplify_text(text, params.get("level", "Intermediate"))
+    if method == "process":
+        from backend_module import simplify_text, summarize_text
+        return lambda text, params: (simplify_text if params.get("task") == "Simplify" else summarize_text)(text)
+    if method == "save":
+        import sqlite3
+        import tempfile
+        # Replay writes into a scratch database, never the real library.
+        db = os.path.join(tempfile.gettempdir(), "clauseease-replay.db")
+        conn = sqlite3.connect(db, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS documents(id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "user_id INTEGER, filename TEXT, mime TEXT, content TEXT, created_at TEXT)")
+        lock = threading.Lock()
+
+        def run(text, params):
+            with lock, conn:
+                conn.execute("INSERT INTO documents(user_id, filename, mime, content, created_at) "
+                             "VALUES(0,?,?,?,datetime('now'))", (params.get("filename"), params.get("mime"), text))
+        return run
+    raise KeyError(method)
+
+
+def iter_log(path: str):
+    """Entries from a log and its rotated backups, oldest file first, one line at a time."""
+    for file_path in [f"{path}.{i}" for i in range(BACKUPS, 0, -1)] + [path]:
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def read_log(path: str) -> list[dict]:
+    """Entries from a log and its rotated backups, oldest first."""
+    return sorted(iter_log(path), key=lambda e: e["ts"])
+
+
+def replay(path: str, speed: float = 1.0, concurrency: int = 4, methods: list[str] | None = None) -> dict:
+    """
+    Re-run logged requests against the current code. With speed > 0 the
+    original inter-arrival gaps are kept (divided by speed); speed 0 sends
+    everything as fast as the worker pool allows.
+    """
+    entries = [e for e in read_log(path) if not methods or e["method"] in methods]
+    handlers, results = {}, {}
+    lock = threading.Lock()
+
+    def run(entry):
+        method = entry["method"]
+        bucket = results.setdefault(method, {"replayed_ms": [], "original_ms": [], "errors": 0, "missing_input": 0})
+        try:
+            text = read_input(entry["input_sha256"])
+        except FileNotFoundError:
+            with lock:
+                bucket["missing_input"] += 1
+            return
+        start = time.perf_counter()
+        try:
+            handlers[method](text, entry.get("params") or {})
+        except Exception:
+            with lock:
+                bucket["errors"] += 1
+            return
+        with lock:
+            bucket["replayed_ms"].append((time.perf_counter() - start) * 1000)
+            if entry.get("total_ms") is not None:
+                bucket["original_ms"].append(entry["total_ms"])
+
+    for method in {e["method"] for e in entries}:
+        try:
+            handlers[method] = _handler(method)
+        except (KeyError, ImportError):
+            pass
+    entries = [e for e in entries if e["method"] in handlers]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = entries[0]["ts"] if entries else 0
+        for entry in entries:
+            if speed > 0:
+                delay = (entry["ts"] - t0) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, entry)
+    elapsed = time.perf_counter() - start
+
+    def summary(values):
+        if not values:
+            return None
+        values = sorted(values)
+        return {"mean": round(statistics.mean(values), 1), "p50": round(values[len(values) // 2], 1),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1)}
+
+    return {
+        "requests": len(entries),
+        "elapsed_s": round(elapsed, 2),
+        "methods": {
+            m: {"count": len(b["replayed_ms"]), "errors": b["errors"], "missing_input": b["missing_input"],
+                "replayed_ms": summary(b["replayed_ms"]), "original_ms": summary(b["original_ms"])}
+            for m, b in results.items()
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured request log against the current code.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_replay = sub.add_parser("replay")
+    p_replay.add_argument("path", nargs="?", default=LOG_PATH)
+    p_replay.add_argument("--speed", type=float, default=1.0, help="Pacing multiplier; 0 = no pacing")
+    p_replay.add_argument("--concurrency", type=int, default=4)
+    p_replay.add_argument("--method", action="append", help="Only replay this method (repeatable)")
+    args = parser.parse_args(argv)
+    print(json.dumps(replay(args.path, args.speed, args.concurrency, args.method), indent=2))
+
+
+if __name__ == "__main__":
+    main()
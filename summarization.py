@@ -0,0 +1,171 @@
+# summarization.py
+# -------------------------------------------------------------
+# Abstractive (BART) and hybrid extractive summarization.
+# Used by pages/summarizer.py and by background/offline tools.
+# -------------------------------------------------------------
+
+import time
+from contextlib import nullcontext
+
+import numpy as np
+from nltk.tokenize import sent_tokenize
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import encoder_cache
+from inference_scheduler import get_scheduler
+from model_registry import (
+    DEFAULT_MODEL, count_tokens, interactive_depth, load_model, queue_depth,
+    record_selection, select_model, track_request,
+)
+
+# ---------------------------
+# Load abstractive model (BART)
+# ---------------------------
+def load_abstractive_model(name: str = DEFAULT_MODEL):
+    """
+    Load and cache a registered summarization model.
+    Returns the tokenizer and model from Hugging Face's Transformers library."""
+    _, tokenizer, model = load_model(name)
+    return tokenizer, model
+
+def _encode(model, inputs):
+    """Run only the encoder (owned by the model); returns its last hidden state."""
+    try:
+        import torch
+        no_grad = torch.no_grad()
+    except ImportError:
+        # Stub models (load_test.py) run without torch.
+        no_grad = nullcontext()
+    with no_grad:
+        return model.get_encoder()(**inputs, return_dict=True).last_hidden_state
+
+
+def _encoder_outputs(hidden):
+    try:
+        from transformers.modeling_outputs import BaseModelOutput
+    except ImportError:
+        return {"last_hidden_state": hidden}
+    return BaseModelOutput(last_hidden_state=hidden)
+
+# ---------------------------
+# Abstractive summarization (Purvesh's contribution)
+# ---------------------------
+def abstractive_summarize(text: str, max_length: int = 130, min_length: int = 30,
+                          latency_budget_ms: float | None = None, stats: dict | None = None,
+                          background: bool = False, stopping_criteria=None) -> str:
+    """
+    Generate a human-like abstractive summary using a BART model.
+    Follows a 4-step pipeline:
+        1. Preprocess input text
+        2. Pick a model from the registry for this input size and latency target
+        3. Generate and decode summary
+        4. Postprocess for readability
+    If `stats` is given it is filled with the chosen model and stage timings.
+    Background callers pass background=True (and usually a stopping_criteria
+    that yields to interactive requests and sets stats["preempted"] when it does).
+    """
+    
+    if not text.strip():
+        return " ⚠️ Please provide text to summarize."
+
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    input_tokens = count_tokens(text)
+    # Background jobs yield as soon as an interactive request arrives, so they
+    # must not count as load when picking a model for an interactive one.
+    depth = queue_depth() if background else interactive_depth()
+    spec = select_model(input_tokens, max_length, latency_budget_ms, depth)
+    tokenizer, model = load_abstractive_model(spec.name)
+    stats["model"] = spec.name
+    scheduler = get_scheduler()
+    key = encoder_cache.text_key(text)
+
+    # Preprocessing (on the tokenization pool, off the inference cores).
+    # Token ids and encoder states are cached per text, so changing the
+    # length or beam settings on the same text only re-runs the decoder.
+    inputs = encoder_cache.cached(("tokens", spec.checkpoint, key), lambda: scheduler.tokenize(
+        tokenizer,
+        text,
+        return_tensors="pt", 
+        max_length=1024, 
+        truncation=True,
+        ))
+    stats["tokenize_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    # Summary generation: the scheduler decides when this runs and with how many threads
+    start = time.perf_counter()
+    with track_request(background), scheduler.slot(background) as threads:
+        stats["queue_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        stats["threads"] = threads
+        start = time.perf_counter()
+        stats["encoder_cached"] = True
+
+        def encode():
+            stats["encoder_cached"] = False
+            return _encode(model, inputs)
+
+        hidden = encoder_cache.cached(("encoder", spec.checkpoint, key), encode)
+        stats["encode_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        summary_ids = model.generate(
+            **inputs,
+            # A fresh wrapper each time: generate() expands it in place for beam search.
+            encoder_outputs=_encoder_outputs(hidden),
+            max_length=max_length,
+            min_length=min_length,
+            length_penalty=2.0,
+            num_beams=spec.num_beams,
+            early_stopping=spec.num_beams > 1,
+            stopping_criteria=stopping_criteria,
+        )
+    stats["generate_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    # A generation cut short by the stopping criteria says nothing about the model's latency.
+    if not stats.get("preempted"):
+        record_selection(spec, input_tokens, max_length, depth, latency_budget_ms, stats["generate_ms"],
+                         stats["encoder_cached"])
+    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+
+# ---------------------------
+# Enhanced Hybrid Extractive Summarization
+# ---------------------------
+def hybrid_summarize(text: str, compression_ratio: float = 0.4) -> str:
+    sentences = sent_tokenize(text)
+    if len(sentences) <= 2:
+        return " ".join(sentences)
+
+    # 1. Calculate TF-IDF scores
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(sentences)
+    sentence_scores = tfidf_matrix.sum(axis=1).A1
+    
+    # Normalize scores to a 0-1 range
+    if sentence_scores.max() > 0:
+        sentence_scores = (sentence_scores - sentence_scores.min()) / (sentence_scores.max() - sentence_scores.min())
+    
+    # 2. Calculate position scores (higher for earlier sentences)
+    position_scores = np.array([1 / (i + 1) for i in range(len(sentences))])
+    # Normalize position scores
+    position_scores = (position_scores - position_scores.min()) / (position_scores.max() - position_scores.min())
+
+    # 3. Calculate length scores (closer to average length is better)
+    sentence_lengths = np.array([len(s.split()) for s in sentences])
+    avg_length = np.mean(sentence_lengths)
+    length_scores = np.exp(-np.abs(sentence_lengths - avg_length) / avg_length)
+
+    # 4. Combine scores with adjustable weights
+    alpha = 0.5  # Weight for TF-IDF
+    beta = 0.3   # Weight for Position
+    gamma = 0.2  # Weight for Length
+    
+    total_scores = (alpha * sentence_scores + beta * position_scores + gamma * length_scores)
+    
+    # Debugging: Print scores to see the ranking
+    # for i, (s, score) in enumerate(zip(sentences, total_scores)):
+    #     st.write(f"Sentence {i+1} (Score: {score:.4f}): {s}")
+    
+    # 5. Select top sentences
+    n = max(1, int(len(sentences) * compression_ratio))
+    top_idx = np.argsort(total_scores)[-n:]
+    top_idx_sorted = sorted(top_idx)
+    summary_sentences = [sentences[i] for i in top_idx_sorted]
+
+    return " ".join(summary_sentences)
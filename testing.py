@@ -1,5 +1,9 @@
 import streamlit as st
 from backend_module import simplify_text, summarize_text
+import blob_store
+from request_log import Stages, log_request
+from doc_viewer import render_document
+import readability
 
 st.set_page_config(
     page_title="Contract Simplifier & Summarizer",
@@ -105,9 +109,18 @@ else:
     if uploaded_file:
         input_text = uploaded_file.read().decode("utf-8")
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def text_metrics(text: str) -> dict:
+    # Cached per text, so reruns (theme toggle, paging) don't re-score.
+    return readability.metrics(text)
+
 if input_text.strip():
-    word_count = len(input_text.strip().split())
-    st.info(f"🧮 Word Count: {word_count}")
+    m = text_metrics(input_text.strip())
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("🧮 Word Count", m["word_count"])
+    c2.metric("Flesch Reading Ease", m["flesch"])
+    c3.metric("Grade Level", m["grade_level"])
+    c4.metric("Legalese / 100 words", m["legalese_density"])
 
 st.subheader("Step 2: Choose Operation")
 task = st.radio("Select an action", ["Simplify", "Summarize"])
@@ -116,30 +129,38 @@ if st.button("Process"):
     if not input_text.strip():
         st.warning("⚠ Please provide some input text first.")
     else:
-        with st.spinner("⏳ Processing..."):
+        stages = Stages()
+        with st.spinner("⏳ Processing..."), stages(task.lower()):
             if task == "Simplify":
                 output_text = simplify_text(input_text)
             else:
                 output_text = summarize_text(input_text)
-
-        st.subheader("📤 Results")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("### 📝 Original Text")
-            st.write(input_text)
-
-        with col2:
-            st.markdown(f"### ✨ {task}d Text")
-            st.write(output_text)
-
-            st.download_button(
-                label="📥 Download Result",
-                data=output_text,
-                file_name=f"{task.lower()}_output.txt",
-                mime="text/plain"
-            )
+        log_request("process", {"task": task}, input_text, output_text, stages)
+        # Kept across reruns so paging through the panes doesn't lose the result.
+        blob_store.session_put("process_result", {"task": task, "input": input_text, "output": output_text})
+        for k in ("orig_page", "result_page"):
+            st.session_state.pop(k, None)
+
+result = blob_store.session_get("process_result")
+if result:
+    st.subheader("📤 Results")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### 📝 Original Text")
+        render_document(result["input"], key="orig")
+
+    with col2:
+        st.markdown(f"### ✨ {result['task']}d Text")
+        render_document(result["output"], key="result")
+
+        st.download_button(
+            label="📥 Download Result",
+            data=result["output"],
+            file_name=f"{result['task'].lower()}_output.txt",
+            mime="text/plain"
+        )
 
 st.markdown("---")
 st.markdown(